@@ -1,41 +1,32 @@
-import pygame
 import sys
 import random
+import matplotlib
+
+# ===== 実行モード =====
+# --headless: pygame を一切使わず、描画なしの最高速で学習する
+HEADLESS = "--headless" in sys.argv
+if HEADLESS:
+    matplotlib.use("Agg")
+
 import matplotlib.pyplot as plt
 import pickle
 import os
 
 
-# ===== Pygame初期化 =====
-pygame.init()
-
-# 画面サイズとタイル
-SCREEN_WIDTH, SCREEN_HEIGHT = 900, 640
-TILE_SIZE = 32
-WHITE = (255, 255, 255)
-
-# ウィンドウ
-screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
-pygame.display.set_caption("hunter task - Q Learning")
-
 # マップ（20x20）
 map_data = [[0 for _ in range(20)] for _ in range(20)]
 
-# 画像
-ground_img = pygame.image.load("images/ground.png")
-ground_img = pygame.transform.scale(ground_img, (TILE_SIZE, TILE_SIZE))
-player1_img = pygame.image.load("images/player1.png")
-player1_img = pygame.transform.scale(player1_img, (TILE_SIZE, TILE_SIZE))
-prey1_img = pygame.image.load("images/prey1.png")
-prey1_img = pygame.transform.scale(prey1_img, (TILE_SIZE, TILE_SIZE))
-
-# フォント
-font = pygame.font.SysFont(None, 24)
-
 # グリッドサイズ
 GRID_W = len(map_data[0])
 GRID_H = len(map_data)
 
+# 描画（オブザーバ）
+if HEADLESS:
+    renderer = None
+else:
+    from renderer import HunterRenderer
+    renderer = HunterRenderer("hunter task - Q Learning", GRID_W, GRID_H)
+
 # ===== Q学習エージェント =====
 class QLearningAgent:
     def __init__(self, grid_w, grid_h, actions, alpha=0.2, gamma=0.95, eps_start=1.0, eps_end=0.05, eps_decay=0.995):
@@ -95,19 +86,6 @@ def torus_distance(x1, y1, x2, y2, w, h):
     dy = min(abs(y1 - y2), h - abs(y1 - y2))
     return (dx**2 + dy**2) ** 0.5
 
-# 描画
-def draw_map():
-    for row in range(len(map_data)):
-        for col in range(len(map_data[row])):
-            if map_data[row][col] == 0:
-                screen.blit(ground_img, (col * TILE_SIZE, row * TILE_SIZE))
-
-def draw_player(img, x, y):
-    screen.blit(img, (x * TILE_SIZE, y * TILE_SIZE))
-
-def draw_prey(img, x, y):
-    screen.blit(img, (x * TILE_SIZE, y * TILE_SIZE))
-
 # 獲物ランダム移動
 def move_prey(prey_x, prey_y):
     r = random.random()
@@ -157,14 +135,11 @@ def reset_episode():
     steps_in_episode = 0
     episode += 1
 
-clock = pygame.time.Clock()
-
 # ===== メインループ =====
 while True:
-    for event in pygame.event.get():
-        if event.type == pygame.QUIT:
-            pygame.quit()
-            sys.exit()
+    if renderer and renderer.quit_requested():
+        renderer.close()
+        sys.exit()
 
     # --- Q学習でハンター行動 ---
     state = (player1_x, player1_y, prey1_x, prey1_y)
@@ -220,27 +195,21 @@ while True:
         max_steps = max(steps_per_episode)
         plt.yticks(range(0, int(max_steps)+100, 10))
         plt.grid(True)
-        plt.show()
-        pygame.quit()
+        if renderer:
+            plt.show()
+            renderer.close()
+        else:
+            plt.savefig("steps_per_episode.png")
         sys.exit()
         
 
-    # --- 表示更新 ---
-
-    text_count = font.render(f"Total Steps: {count_total_steps}", True, (255, 0, 0))
-    text_ep = font.render(f"Episode: {episode}  Steps(episode): {steps_in_episode}  epsilon: {agent.epsilon:.3f}", True, (0, 0, 255))
-
     # --- 描画 ---
-    screen.fill(WHITE)
-    draw_map()
-    draw_player(player1_img, player1_x, player1_y)
-    draw_prey(prey1_img, prey1_x, prey1_y)
-    screen.blit(text_count, (650, 40))
-    screen.blit(text_ep, (650, 70))
-    pygame.display.flip()
-
-    if episode <= MAX_EPISODES - 30:
-        clock.tick()
-    else:
-        clock.tick(30)
-
+    if renderer:
+        text_count = f"Total Steps: {count_total_steps}"
+        text_ep = f"Episode: {episode}  Steps(episode): {steps_in_episode}  epsilon: {agent.epsilon:.3f}"
+        renderer.render(
+            [(player1_x, player1_y)],
+            [(prey1_x, prey1_y)],
+            texts=[(text_count, (255, 0, 0), (650, 40)), (text_ep, (0, 0, 255), (650, 70))],
+            fps=0 if episode <= MAX_EPISODES - 30 else 30,
+        )
@@ -6,6 +6,7 @@ import os
 # ==========================================
 #  設定
 # ==========================================
+# .parquet を指定すると列指向のログを読み書きする
 INPUT_FILE = "detailed_log_2.csv"             # 読み込むログファイル
 OUTPUT_DETAIL_FILE = "analyzed_detailed_log_2.csv" # 出力：詳細分析データ
 OUTPUT_SUMMARY_FILE = "analyzed_summary_2.csv"     # 出力：集計サマリー
@@ -14,6 +15,22 @@ OUTPUT_SUMMARY_FILE = "analyzed_summary_2.csv"     # 出力：集計サマリー
 GRID_W = 20
 GRID_H = 20
 
+# ==========================================
+#  ログの読み書き（拡張子が .parquet なら列指向、それ以外は CSV）
+# ==========================================
+
+def read_log(path):
+    if path.endswith(".parquet"):
+        # 判定の印・行動・狙いなどは category 型、座標は int8 のまま読み込まれる
+        return pd.read_parquet(path)
+    return pd.read_csv(path)
+
+def write_log(df, path):
+    if path.endswith(".parquet"):
+        df.to_parquet(path, index=False, compression="zstd")
+    else:
+        df.to_csv(path, index=False, encoding='utf-8_sig')
+
 # ==========================================
 #  距離計算関数 (トーラス考慮)
 # ==========================================
@@ -137,7 +154,7 @@ def main():
         return
 
     print(f"[{INPUT_FILE}] を読み込み中...")
-    df = pd.read_csv(INPUT_FILE)
+    df = read_log(INPUT_FILE)
 
     # 新しく追加する列名の定義
     new_cols = [
@@ -158,7 +175,7 @@ def main():
     df_out = pd.concat([df, analysis_results], axis=1)
 
     # 詳細ログの保存
-    df_out.to_csv(OUTPUT_DETAIL_FILE, index=False, encoding='utf-8_sig')
+    write_log(df_out, OUTPUT_DETAIL_FILE)
     print(f"詳細な分析結果を保存しました: {OUTPUT_DETAIL_FILE}")
 
     # ==========================================
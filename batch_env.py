@@ -0,0 +1,198 @@
+import argparse
+import os
+import time
+import numpy as np
+
+from qtable import QTable
+from greedy_policy import GreedyPolicy, batch_decide_lv0, batch_decide_lv1
+
+# =========================================================
+#  ヘッドレス・バッチ環境（NumPy）
+#  noplayer_qlearning.py のメインループと同じルールで、
+#  N エピソードをロックステップでまとめて進める。
+# =========================================================
+
+# ===== マップ・行動設定 =====
+GRID_W, GRID_H = 20, 20
+MAX_STEPS = 100
+
+ACTION_DXY = np.array([
+    (0, -1),  # UP
+    (0,  1),  # DOWN
+    (-1, 0),  # LEFT
+    (1,  0),  # RIGHT
+    (0,  0),  # STAY
+], dtype=np.int64)
+
+# 獲物の移動確率（20%で上、40%で右、残りはその場に留まる）
+PREY_UP_PROB = 0.2
+PREY_RIGHT_PROB = 0.4
+
+# ===== 相対座標計算（get_relative_state のベクトル版） =====
+def relative_offsets(px, py, tx, ty, w=GRID_W, h=GRID_H):
+    """
+    プレイヤー(px, py)から見たターゲット(tx, ty)の相対位置(dx, dy)を配列で返す。
+    トーラスの折り返しは get_relative_state と同じ規則（±w/2 はそのまま残る）。
+    """
+    dx = np.asarray(tx) - np.asarray(px)
+    dy = np.asarray(ty) - np.asarray(py)
+    dx = np.where(dx > w / 2, dx - w, np.where(dx < -w / 2, dx + w, dx))
+    dy = np.where(dy > h / 2, dy - h, np.where(dy < -h / 2, dy + h, dy))
+    return dx, dy
+
+# ===== 初期配置（重複なし） =====
+def sample_non_overlapping_cells(rng, n_envs, k, n_cells):
+    """各エピソードについて n_cells 個のセルから重複なしで k 個選ぶ。"""
+    cells = rng.integers(0, n_cells, size=(n_envs, k))
+    while True:
+        s = np.sort(cells, axis=1)
+        dup = (s[:, 1:] == s[:, :-1]).any(axis=1)
+        if not dup.any():
+            return cells
+        cells[dup] = rng.integers(0, n_cells, size=(int(dup.sum()), k))
+
+# =========================================================
+#  バッチ環境クラス
+# =========================================================
+class BatchHunterEnv:
+    """
+    2ハンター・2獲物のハンタータスクを N エピソード分まとめて保持する。
+    ルールは noplayer_qlearning.py と同じ：
+      1. ハンター移動（捕獲済みのハンターは動かない）
+      2. 捕獲判定（いずれかの獲物と座標が一致したハンターは捕獲済み）
+      3. 獲物移動（ハンター i が捕獲済みなら獲物 i は止まる）
+      4. 両ハンター捕獲済み、または max_steps 到達でエピソード終了
+    """
+    def __init__(self, n_envs, grid_w=GRID_W, grid_h=GRID_H, max_steps=MAX_STEPS, seed=None):
+        self.n_envs = n_envs
+        self.grid_w = grid_w
+        self.grid_h = grid_h
+        self.max_steps = max_steps
+        self.rng = np.random.default_rng(seed)
+
+        self.hunters = np.zeros((n_envs, 2, 2), dtype=np.int64)  # [env, hunter, (x, y)]
+        self.preys = np.zeros((n_envs, 2, 2), dtype=np.int64)    # [env, prey, (x, y)]
+        self.hunt = np.zeros((n_envs, 2), dtype=bool)            # ハンターごとの捕獲フラグ
+        self.steps = np.zeros(n_envs, dtype=np.int64)
+        self.done = np.zeros(n_envs, dtype=bool)
+
+    def reset(self):
+        cells = sample_non_overlapping_cells(self.rng, self.n_envs, 4, self.grid_w * self.grid_h)
+        xy = np.stack([cells // self.grid_h, cells % self.grid_h], axis=-1)
+        self.hunters[:] = xy[:, 0:2]
+        self.preys[:] = xy[:, 2:4]
+        self.hunt[:] = False
+        self.steps[:] = 0
+        self.done[:] = False
+
+    def step(self, actions):
+        """
+        actions: (N, 2) の行動インデックス（ACTIONS の順）。
+        終了済みのエピソードは何も変化しない。戻り値は done 配列。
+        """
+        active = ~self.done
+
+        # --- ハンター移動 ---
+        move = (active[:, None] & ~self.hunt)[..., None]
+        self.hunters += ACTION_DXY[actions] * move
+        self.hunters[..., 0] %= self.grid_w
+        self.hunters[..., 1] %= self.grid_h
+
+        # --- 捕獲判定 ---
+        on_prey = (self.hunters[:, :, None, :] == self.preys[:, None, :, :]).all(axis=-1).any(axis=-1)
+        self.hunt |= on_prey & active[:, None]
+
+        # --- 獲物移動 ---
+        r = self.rng.random((self.n_envs, 2))
+        prey_move = active[:, None] & ~self.hunt
+        up = (r < PREY_UP_PROB) & prey_move
+        right = (r >= PREY_UP_PROB) & (r < PREY_UP_PROB + PREY_RIGHT_PROB) & prey_move
+        self.preys[..., 0] = (self.preys[..., 0] + right) % self.grid_w
+        self.preys[..., 1] = (self.preys[..., 1] - up) % self.grid_h
+
+        # --- エピソード終了判定 ---
+        self.steps += active
+        self.done |= active & (self.hunt.all(axis=1) | (self.steps >= self.max_steps))
+        return self.done
+
+    def relative_to_preys(self, hunter):
+        """指定ハンターから獲物1・獲物2への相対位置を返す: ((dx1, dy1), (dx2, dy2))"""
+        hx, hy = self.hunters[:, hunter, 0], self.hunters[:, hunter, 1]
+        return tuple(
+            relative_offsets(hx, hy, self.preys[:, p, 0], self.preys[:, p, 1], self.grid_w, self.grid_h)
+            for p in range(2)
+        )
+
+# =========================================================
+#  Lv0 / Lv1 の Qテーブル方策の評価
+# =========================================================
+def evaluate_q_policy(q_lv0, q_lv1, n_episodes, seed=None, max_steps=MAX_STEPS):
+    """
+    player1 = Lv0（q_lv0）、player2 = Lv1（q_lv1、相手モデルに q_lv0）で
+    n_episodes 本を同時に走らせ、エピソードごとのステップ数と意図推定精度を返す。
+    q_lv0 / q_lv1 は QTable。
+    """
+    policy_lv0 = GreedyPolicy(q_lv0)
+    policy_lv1 = GreedyPolicy(q_lv1)
+    env = BatchHunterEnv(n_episodes, max_steps=max_steps, seed=seed)
+    # 方策のタイブレーク用乱数は獲物の乱数とは別系列にする
+    policy_rng = np.random.default_rng(env.rng.integers(2**63))
+    env.reset()
+
+    logged = np.zeros(n_episodes, dtype=np.int64)
+    correct = np.zeros(n_episodes, dtype=np.int64)
+
+    while not env.done.all():
+        rel_p1 = env.relative_to_preys(0)
+        rel_p2 = env.relative_to_preys(1)
+        action1, target1 = batch_decide_lv0(policy_lv0, *rel_p1, policy_rng)
+        action2, _, est_target = batch_decide_lv1(policy_lv1, policy_lv0, *rel_p2, *rel_p1, policy_rng)
+
+        # 意図推定の正誤（どちらのハンターもまだ捕獲していないステップのみ記録）
+        record = ~env.done & ~env.hunt.any(axis=1)
+        logged += record
+        correct += record & (target1 == est_target)
+
+        env.step(np.stack([action1, action2], axis=1))
+
+    accuracy = np.where(logged > 0, correct / np.maximum(logged, 1) * 100, 0.0)
+    return {
+        "Steps": env.steps.copy(),
+        "Cleared": env.hunt.all(axis=1),
+        "Accuracy": accuracy,
+    }
+
+# =========================================================
+#  コマンドライン実行
+# =========================================================
+def load_q_table(path):
+    if not os.path.exists(path):
+        print(f"Warning: {path} not found.")
+        return QTable()
+    return QTable.load(path)
+
+def main():
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description="Qテーブル方策のバッチ評価（ヘッドレス）")
+    parser.add_argument("--episodes", type=int, default=100000)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--q1", default=os.path.join(base_dir, "q_table.pkl"), help="Lv0 の Qテーブル")
+    parser.add_argument("--q2", default=os.path.join(base_dir, "q_table.pkl2"), help="Lv1 の Qテーブル")
+    args = parser.parse_args()
+
+    q_lv0 = load_q_table(args.q1)
+    q_lv1 = load_q_table(args.q2)
+
+    start = time.perf_counter()
+    result = evaluate_q_policy(q_lv0, q_lv1, args.episodes, seed=args.seed)
+    elapsed = time.perf_counter() - start
+
+    steps = result["Steps"]
+    print(f"エピソード数: {args.episodes}")
+    print(f"平均ステップ数: {steps.mean():.2f} (最小 {steps.min()}, 最大 {steps.max()})")
+    print(f"クリア率: {result['Cleared'].mean() * 100:.2f}%")
+    print(f"平均意図推定精度: {result['Accuracy'].mean():.2f}%")
+    print(f"実行時間: {elapsed:.2f} 秒 ({args.episodes / elapsed:.0f} episodes/sec)")
+
+if __name__ == "__main__":
+    main()
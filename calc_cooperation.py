@@ -1,10 +1,12 @@
 import pandas as pd
 import os
 
+from analyze_logs import read_log  # 拡張子が .parquet なら列指向、それ以外は CSV
+
 # ==========================================
 #  ファイル設定
 # ==========================================
-INPUT_FILE = "analyzed_detailed_log_2.csv"
+INPUT_FILE = "analyzed_detailed_log_2.csv"  # .parquet も読める
 OUTPUT_FILE = "cooperation_rate_result_2.csv"
 
 # ==========================================
@@ -51,7 +53,7 @@ def main():
 
     print(f"[{INPUT_FILE}] を読み込み中...")
     try:
-        df = pd.read_csv(INPUT_FILE)
+        df = read_log(INPUT_FILE)
     except Exception as e:
         print(f"ファイル読み込みエラー: {e}")
         return
@@ -0,0 +1,123 @@
+import random
+import numpy as np
+
+# =========================================================
+#  Qテーブルの貪欲方策（評価用に事前計算）
+#  評価中は Qテーブルが固定なので、各相対状態の
+#  「最大Q値」と「最大値を持つ行動の集合」を一度だけ計算しておき、
+#  毎ステップの Lv0 / Lv1 の判断を表引きだけで済ませる。
+# =========================================================
+
+class GreedyPolicy:
+    def __init__(self, table):
+        self.table = table
+        self.actions = table.actions
+        self.grid_w = table.grid_w
+        self.grid_h = table.grid_h
+
+        q = table.values
+        # --- 配列版（バッチ用） ---
+        self.max_q = q.max(axis=-1)
+        is_best = q == self.max_q[..., None]
+        self.best_count = is_best.sum(axis=-1)
+        # 最大値の行動を ACTIONS の順に先頭へ詰めた表（best_count 以降は使わない）
+        self.best_actions = np.argsort(~is_best, axis=-1, kind="stable")
+
+        # --- 辞書版（1エピソードずつ回すスクリプト用） ---
+        self._best = {}
+        for ix in range(q.shape[0]):
+            for iy in range(q.shape[1]):
+                names = tuple(self.actions[k] for k in self.best_actions[ix, iy, :self.best_count[ix, iy]])
+                state = (ix - table.half_w, iy - table.half_h)
+                self._best[state] = (names, float(self.max_q[ix, iy]))
+
+    # ===== 相対座標計算（get_relative_state と同じ） =====
+    def relative_state(self, px, py, tx, ty):
+        w, h = self.grid_w, self.grid_h
+        dx = tx - px
+        dy = ty - py
+        if dx > w / 2: dx -= w
+        elif dx < -w / 2: dx += w
+        if dy > h / 2: dy -= h
+        elif dy < -h / 2: dy += h
+        return (dx, dy)
+
+    # ===== 1状態ずつ（get_action_pure_q の置き換え） =====
+    def choose(self, px, py, tx, ty, rng=random):
+        """
+        最大Q値の行動（同点は rng.choice）と最大Q値を返す。
+        乱数の消費は get_action_pure_q と同じなので、同じシードなら同じ軌跡になる。
+        """
+        names, max_q = self._best[self.relative_state(px, py, tx, ty)]
+        return rng.choice(names), max_q
+
+    # ===== 配列でまとめて =====
+    def choose_batch(self, dx, dy, rng):
+        """相対座標の配列に対して (行動インデックス配列, 最大Q値配列) を返す。"""
+        ix, iy = self.table.index(np.atleast_1d(dx), np.atleast_1d(dy))
+        pick = (rng.random(ix.shape) * self.best_count[ix, iy]).astype(np.int64)
+        return self.best_actions[ix, iy, pick], self.max_q[ix, iy]
+
+# =========================================================
+#  エージェント思考ロジック（noplayer_qlearning.py と同じ判断）
+# =========================================================
+def decide_lv0_action(own_policy, own_pos, prey1_pos, prey2_pos, rng=random):
+    act1, val1 = own_policy.choose(*own_pos, *prey1_pos, rng=rng)
+    act2, val2 = own_policy.choose(*own_pos, *prey2_pos, rng=rng)
+
+    if val1 > val2:
+        target = "prey1"
+        final_action = act1
+    elif val2 > val1:
+        target = "prey2"
+        final_action = act2
+    else:
+        if rng.random() < 0.5:
+            target = "prey1"
+            final_action = act1
+        else:
+            target = "prey2"
+            final_action = act2
+    return final_action, target
+
+def decide_lv1_action(own_policy, opp_policy, own_pos, opp_pos, prey1_pos, prey2_pos, rng=random):
+    # 相手の行動自体は使わないが、乱数の消費を元の実装と揃えるため choose を通す
+    _, opp_val1 = opp_policy.choose(*opp_pos, *prey1_pos, rng=rng)
+    _, opp_val2 = opp_policy.choose(*opp_pos, *prey2_pos, rng=rng)
+
+    if opp_val1 > opp_val2:
+        est_target = "prey1"
+    elif opp_val2 > opp_val1:
+        est_target = "prey2"
+    else:
+        est_target = "prey1" if rng.random() < 0.5 else "prey2"
+
+    if est_target == "prey1":
+        my_target = "prey2"
+        final_action, _ = own_policy.choose(*own_pos, *prey2_pos, rng=rng)
+    else:
+        my_target = "prey1"
+        final_action, _ = own_policy.choose(*own_pos, *prey1_pos, rng=rng)
+
+    return final_action, my_target, est_target
+
+# ===== バッチ版（獲物インデックス 0 = prey1, 1 = prey2） =====
+def batch_decide_lv0(own_policy, rel1, rel2, rng):
+    """rel1 / rel2: 自分から獲物1・獲物2への相対座標 (dx配列, dy配列)"""
+    act1, val1 = own_policy.choose_batch(*rel1, rng)
+    act2, val2 = own_policy.choose_batch(*rel2, rng)
+    coin = rng.random(act1.shape) < 0.5
+    pick1 = (val1 > val2) | ((val1 == val2) & coin)
+    return np.where(pick1, act1, act2), np.where(pick1, 0, 1)
+
+def batch_decide_lv1(own_policy, opp_policy, own_rel1, own_rel2, opp_rel1, opp_rel2, rng):
+    opp_val1 = opp_policy.max_q[opp_policy.table.index(*opp_rel1)]
+    opp_val2 = opp_policy.max_q[opp_policy.table.index(*opp_rel2)]
+    coin = rng.random(opp_val1.shape) < 0.5
+    est_target = np.where((opp_val1 > opp_val2) | ((opp_val1 == opp_val2) & coin), 0, 1)
+
+    my_target = 1 - est_target
+    dx = np.where(my_target == 0, own_rel1[0], own_rel2[0])
+    dy = np.where(my_target == 0, own_rel1[1], own_rel2[1])
+    action, _ = own_policy.choose_batch(dx, dy, rng)
+    return action, my_target, est_target
@@ -0,0 +1,197 @@
+import asyncio
+import json
+import os
+import random
+import re
+from openai import AsyncOpenAI
+
+from prompt_builder import estimate_usage
+
+# =========================================================
+#  LLM バックエンド
+#  call_llm / BDI の各関数は backend.complete(...) だけを呼ぶ。
+#  OpenAIBackend: 実際の API（AsyncOpenAI）
+#  HeuristicBackend: ネットワークなしで動く代役。同じ JSON キー
+#    （狙っている獲物・次の行動・他者の意図 ...）をトーラス距離の簡単な規則で返すので、
+#    ターン処理・ログ処理全体をオフラインで計測・負荷試験できる。
+# =========================================================
+
+class LLMBackend:
+    name = "base"
+    # True なら complete_batch が複数プロンプトを1回の推論リクエストで処理する
+    supports_batch = False
+
+    async def complete(self, model, system_prompt, user_prompt, response_format=None):
+        """
+        (応答本文（JSON テキスト）, usage) を返す。
+        usage: {"prompt_tokens", "completion_tokens", "cached_tokens"}
+        """
+        raise NotImplementedError
+
+    async def complete_batch(self, model, prompts, response_format=None):
+        """prompts: [(system_prompt, user_prompt), ...] に対する (応答本文, usage) のリスト（同じ順）。"""
+        return await asyncio.gather(*(
+            self.complete(model, system_prompt, user_prompt, response_format)
+            for system_prompt, user_prompt in prompts
+        ))
+
+    def cache_id(self, model):
+        # 実 API の応答と代役の応答がキャッシュで混ざらないようにする
+        return f"{self.name}:{model}"
+
+class OpenAIBackend(LLMBackend):
+    name = "openai"
+
+    def __init__(self, api_key=None, max_retries=0):
+        # 既定では再試行を SDK ではなく call_llm 側で行い、レート制限の待機を全エピソードで共有する
+        self.client = AsyncOpenAI(api_key=api_key or os.getenv("OPENAI_API_KEY"), max_retries=max_retries)
+
+    async def complete(self, model, system_prompt, user_prompt, response_format=None):
+        kwargs = {"response_format": response_format} if response_format else {}
+        response = await self.client.chat.completions.create(
+            model=model,
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user",   "content": user_prompt},
+            ],
+            **kwargs
+        )
+        usage = response.usage
+        details = getattr(usage, "prompt_tokens_details", None)
+        return response.choices[0].message.content, {
+            "prompt_tokens": usage.prompt_tokens if usage else 0,
+            "completion_tokens": usage.completion_tokens if usage else 0,
+            # プレフィックスキャッシュに当たった分（返さないモデルもある）
+            "cached_tokens": (getattr(details, "cached_tokens", None) or 0) if details else 0,
+        }
+
+    def cache_id(self, model):
+        return model
+
+# =========================================================
+#  オフライン代役
+# =========================================================
+PREY_NAMES = ("獲物A", "獲物B")
+# 「他者の意図: ...」「"他者の意図": "..."」「# 他者の意図（改行）...」のいずれにも合う
+_OPPONENT_INTENT = re.compile(r'他者の(?:推定)?意図"?[ \t]*(?:[:：]|\n)\s*"?([^"\n]*)')
+
+def _find_state(text):
+    """プロンプト中の観測 JSON（自己座標を含む dict）を探す。"""
+    decoder = json.JSONDecoder()
+    for m in re.finditer(r"\{", text):
+        try:
+            obj, _ = decoder.raw_decode(text, m.start())
+        except ValueError:
+            continue
+        if isinstance(obj, dict) and "自己座標" in obj:
+            return obj
+    return None
+
+def _single_prey(text):
+    """獲物A / 獲物B のどちらか一方だけを含む文字列なら、その名前を返す。"""
+    found = [name for name in PREY_NAMES if name in text]
+    return found[0] if len(found) == 1 else None
+
+class HeuristicBackend(LLMBackend):
+    """
+    近い獲物へトーラス上の最短方向に1マス進む。
+    プロンプトに他者の意図（どちらか一方の獲物）が書かれていれば、その獲物を避ける。
+    出力に「他者の意図」と「狙っている獲物」の両方を求められた（推定と行動決定を1回で行う）ときは、
+    自分で推定した他者の狙いを避ける。
+    latency 秒（+ 0〜jitter 秒）待ってから返すので、API の待ち時間も模擬できる。
+    """
+    name = "heuristic"
+    supports_batch = True
+
+    def __init__(self, latency=0.0, jitter=0.0, grid_w=20, grid_h=20, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.grid_w = grid_w
+        self.grid_h = grid_h
+        self._rng = random.Random(seed)
+
+    def _delta(self, src, dst):
+        w, h = self.grid_w, self.grid_h
+        dx = (dst[0] - src[0] + w // 2) % w - w // 2
+        dy = (dst[1] - src[1] + h // 2) % h - h // 2
+        return dx, dy
+
+    def _dist(self, src, dst):
+        dx, dy = self._delta(src, dst)
+        return abs(dx) + abs(dy)
+
+    def _step(self, src, dst):
+        dx, dy = self._delta(src, dst)
+        if dx == 0 and dy == 0:
+            return "その場に留まる"
+        if abs(dx) >= abs(dy):
+            return "右" if dx > 0 else "左"
+        return "下" if dy > 0 else "上"
+
+    def _choose_target(self, me, other, preys, avoid=None):
+        # 自分がすでに獲物の上にいれば、そのまま捕獲を続ける
+        for name in PREY_NAMES:
+            if preys[name] == me:
+                return name
+        # 他者が押さえている獲物と、他者が狙っていると推定した獲物は避ける
+        candidates = [n for n in PREY_NAMES if preys[n] != other] or list(PREY_NAMES)
+        if avoid in candidates and len(candidates) > 1:
+            candidates.remove(avoid)
+        return min(candidates, key=lambda n: self._dist(me, preys[n]))
+
+    def answer(self, system_prompt, user_prompt):
+        state = _find_state(user_prompt) or _find_state(system_prompt)
+        if state is None:
+            return {"狙っている獲物": "不明", "次の行動": "その場に留まる", "理由": "観測なし",
+                    "他者の意図": "不明", "推定理由": "観測なし", "自己の意図": "不明"}
+
+        me = tuple(state["自己座標"])
+        other = tuple(state["他者座標"])
+        preys = {"獲物A": tuple(state["獲物A座標"]), "獲物B": tuple(state["獲物B座標"])}
+
+        avoid = None
+        for value in _OPPONENT_INTENT.findall(system_prompt + "\n" + user_prompt):
+            avoid = _single_prey(value) or avoid
+
+        other_target = self._choose_target(other, me, preys)
+        if avoid is None and '"他者の意図"' in system_prompt and '"狙っている獲物"' in system_prompt:
+            avoid = other_target
+        target = self._choose_target(me, other, preys, avoid)
+        if preys[other_target] == other:
+            opponent_intent = f"{other_target}捕獲中のためその場に留まる"
+        else:
+            opponent_intent = f"{other_target}を狙っている"
+
+        return {
+            "狙っている獲物": target,
+            "次の行動": self._step(me, preys[target]),
+            "理由": f"{target}までのトーラス距離が {self._dist(me, preys[target])}",
+            "他者の意図": opponent_intent,
+            "推定理由": f"他者から{other_target}までのトーラス距離が {self._dist(other, preys[other_target])}",
+            "自己の意図": f"{target}を狙う",
+        }
+
+    async def _wait(self):
+        delay = self.latency + (self._rng.uniform(0, self.jitter) if self.jitter else 0.0)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def _respond(self, system_prompt, user_prompt):
+        text = json.dumps(self.answer(system_prompt, user_prompt), ensure_ascii=False)
+        return text, estimate_usage(system_prompt, user_prompt, text)
+
+    async def complete(self, model, system_prompt, user_prompt, response_format=None):
+        await self._wait()
+        return self._respond(system_prompt, user_prompt)
+
+    async def complete_batch(self, model, prompts, response_format=None):
+        # バッチ推論サーバと同じく、何件まとめても待ち時間は1リクエスト分
+        await self._wait()
+        return [self._respond(system_prompt, user_prompt) for system_prompt, user_prompt in prompts]
+
+def create_backend(name="openai", latency=0.0, jitter=0.0):
+    if name == "openai":
+        return OpenAIBackend()
+    if name == "heuristic":
+        return HeuristicBackend(latency, jitter)
+    raise ValueError(f"unknown backend: {name}")
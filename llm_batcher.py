@@ -0,0 +1,75 @@
+import asyncio
+import json
+
+# =========================================================
+#  エピソードをまたいだプロンプトのまとめ送り
+#  多数のエピソードを並行させると、各ターンで同じ種類の呼び出し
+#  （単独行動・意図推定・協調行動）がエピソードの数だけ同時に発生する。
+#  同じ種類・同じモデルのプロンプトを集めて backend.complete_batch で1リクエストにまとめ、
+#  返ってきた応答をそれぞれのエピソードに返す。
+#  送るタイミング: 並行中のエピソード全員分がそろったとき / max_batch 件に達したとき /
+#  最初のプロンプトから max_wait 秒たったとき（キャッシュに当たったエピソードは来ないため）。
+# =========================================================
+
+class PromptBatcher:
+    def __init__(self, backend, limiter, max_batch=64, max_wait=0.005, timeout=None):
+        self.backend = backend
+        self.limiter = limiter
+        self.timeout = timeout  # まとめたリクエスト1件の期限（秒）
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.active = 0  # 並行中のエピソード数（スケジューラが更新する。0 なら時間窓だけで送る）
+        self.requests = 0
+        self.prompts = 0
+        self._pending = {}
+        self._timers = {}
+        self._tasks = set()
+
+    async def complete(self, kind, model, system_prompt, user_prompt, response_format=None):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        key = (kind, model, json.dumps(response_format, sort_keys=True))
+        group = self._pending.setdefault(key, [])
+        group.append((system_prompt, user_prompt, future))
+
+        if len(group) >= self.max_batch or (self.active and len(group) >= self.active):
+            self._flush(key)
+        elif key not in self._timers:
+            self._timers[key] = loop.call_later(self.max_wait, self._flush, key)
+        return await future
+
+    def _flush(self, key):
+        timer = self._timers.pop(key, None)
+        if timer is not None:
+            timer.cancel()
+        group = self._pending.pop(key, None)
+        if group:
+            task = asyncio.ensure_future(self._send(key, group))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _send(self, key, group):
+        _, model, response_format = key
+        prompts = [(system_prompt, user_prompt) for system_prompt, user_prompt, _ in group]
+        try:
+            # まとめたリクエスト1件を、同時実行数の上限の1枠として数える
+            async with self.limiter:
+                results = await asyncio.wait_for(
+                    self.backend.complete_batch(model, prompts, json.loads(response_format)), self.timeout
+                )
+        except Exception as e:
+            # 失敗はそれぞれの呼び出し元（call_llm の再試行処理）に返す
+            for _, _, future in group:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        self.requests += 1
+        self.prompts += len(group)
+        for (_, _, future), result in zip(group, results):
+            if not future.done():
+                future.set_result(result)
+
+    def summary(self):
+        avg = self.prompts / self.requests if self.requests else 0.0
+        return f"まとめ送り: {self.prompts} プロンプト / {self.requests} リクエスト (平均 {avg:.1f} 件/リクエスト)"
@@ -0,0 +1,96 @@
+import hashlib
+import json
+import sqlite3
+import time
+
+# =========================================================
+#  LLM 応答のディスクキャッシュ（SQLite）
+#  (モデル, system プロンプト, user プロンプト, response_format) のハッシュをキーに、
+#  成功した応答 JSON を保存する。同じ REPLAY_SEEDS で再実行したときは
+#  同じプロンプトが API に送られず、ここから返る。
+#  合計サイズが上限を超えたら、最後に使われた時刻が古いものから消す（LRU）。
+# =========================================================
+
+DEFAULT_CACHE_PATH = "llm_cache.sqlite3"
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+class ResponseCache:
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_bytes=DEFAULT_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+
+        self.conn = sqlite3.connect(path, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY, value TEXT NOT NULL,"
+            " size INTEGER NOT NULL, last_used REAL NOT NULL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses(last_used)")
+        self.total_bytes = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    @staticmethod
+    def make_key(model, system_prompt, user_prompt, response_format):
+        payload = json.dumps([model, system_prompt, user_prompt, response_format],
+                             ensure_ascii=False, sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        """保存済みの応答（毎回新しい dict）を返す。なければ None。"""
+        row = self.conn.execute("SELECT value FROM responses WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (time.time(), key))
+        return json.loads(row[0])
+
+    def put(self, key, value):
+        text = json.dumps(value, ensure_ascii=False)
+        size = len(key) + len(text.encode("utf-8"))
+        old = self.conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+        self.conn.execute(
+            "INSERT OR REPLACE INTO responses (key, value, size, last_used) VALUES (?, ?, ?, ?)",
+            (key, text, size, time.time()),
+        )
+        self.total_bytes += size - (old[0] if old else 0)
+        if self.total_bytes > self.max_bytes:
+            self._evict()
+
+    def _evict(self):
+        # 上限の 9 割まで減らして、追加のたびに削除が走らないようにする
+        target = self.max_bytes * 0.9
+        rows = self.conn.execute("SELECT key, size FROM responses ORDER BY last_used").fetchall()
+        doomed = []
+        for key, size in rows:
+            if self.total_bytes <= target:
+                break
+            doomed.append((key,))
+            self.total_bytes -= size
+        self.conn.executemany("DELETE FROM responses WHERE key = ?", doomed)
+        self.evicted += len(doomed)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        entries = self.conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": entries,
+            "bytes": self.total_bytes,
+            "evicted": self.evicted,
+        }
+
+    def summary(self):
+        s = self.stats()
+        return (f"LLMキャッシュ: ヒット {s['hits']} / ミス {s['misses']} "
+                f"(ヒット率 {s['hit_rate'] * 100:.1f}%), "
+                f"{s['entries']} 件 / {s['bytes'] / 1024 / 1024:.1f} MB, 削除 {s['evicted']} 件")
+
+    def close(self):
+        self.conn.close()
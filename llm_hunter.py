@@ -0,0 +1,622 @@
+import asyncio
+import json
+import random
+import time
+from openai import APIConnectionError, InternalServerError, RateLimitError
+
+from llm_backend import OpenAIBackend
+from llm_batcher import PromptBatcher
+from llm_cache import ResponseCache, DEFAULT_CACHE_PATH, DEFAULT_MAX_BYTES
+from prompt_builder import TokenStats, count_tokens, system_prompt, user_payload
+from rng_streams import EpisodeStreams
+
+# =========================================================
+#  LLM ハンタータスクの共通部品
+#  noplayer_LLM.py（1エピソードずつ描画しながら実行）と
+#  llm_scheduler.py（複数エピソードを並行実行）の両方から使う。
+# =========================================================
+
+GRID_W, GRID_H = 20, 20
+MAX_TURNS = 100
+
+ACTION_TO_DXY = {
+    "上": (0, -1), "下": (0, 1), "左": (-1, 0), "右": (1, 0), "その場に留まる": (0, 0),
+}
+
+# =========================================================
+#  距離計算用関数
+# =========================================================
+def calc_manhattan(p1, p2):
+    return abs(p1[0] - p2[0]) + abs(p1[1] - p2[1])
+
+def calc_torus_manhattan(p1, p2, w, h):
+    dx = abs(p1[0] - p2[0])
+    dy = abs(p1[1] - p2[1])
+    dx_torus = min(dx, w - dx)
+    dy_torus = min(dy, h - dy)
+    return dx_torus + dy_torus
+
+# =========================================================
+#  盤面の更新
+# =========================================================
+def wrap_pos(x, y): return x % GRID_W, y % GRID_H
+
+def move_prey(x, y, r):
+    if r < 0.2: y -= 1
+    elif r < 0.6: x += 1
+    return wrap_pos(x, y)
+
+def sample_non_overlapping_positions(n, rng=random):
+    all_positions = [(x, y) for x in range(GRID_W) for y in range(GRID_H)]
+    return rng.sample(all_positions, n)
+
+def make_state_info(self_pos, other_pos, preyA_pos, preyB_pos, hunt_A, hunt_B):
+    return {
+        "自己座標": self_pos,
+        "他者座標": other_pos,
+        "獲物A座標": preyA_pos,
+        "獲物B座標": preyB_pos,
+        "獲物Aの状態": "捕獲中(HOLD)" if hunt_A else "未捕獲(FREE)",
+        "獲物Bの状態": "捕獲中(HOLD)" if hunt_B else "未捕獲(FREE)"
+    }
+
+# =========================================================
+#  観測の正規化（平行移動）
+#  トーラス上のタスクは平行移動に対して不変なので、行動するハンターが常に盤面の中央に
+#  来るように全座標をずらしてから LLM に渡す。相対配置が同じなら盤面のどこにいても
+#  同じプロンプトになり、エピソードやシードをまたいで応答キャッシュに当たる。
+#  行動（上下左右）と獲物の名前は平行移動で変わらないので、応答はそのまま元の盤面で使える
+#  （理由の文中に出る座標だけは正規化後の座標になる）。
+# =========================================================
+CANONICAL_CENTER = (GRID_W // 2, GRID_H // 2)
+canonical_states = False  # True なら play_turn が正規化した観測を LLM に渡す
+
+def canonicalize_state(state_info):
+    sx, sy = state_info["自己座標"]
+    dx, dy = CANONICAL_CENTER[0] - sx, CANONICAL_CENTER[1] - sy
+    canonical = dict(state_info)
+    for key in ("自己座標", "他者座標", "獲物A座標", "獲物B座標"):
+        x, y = state_info[key]
+        canonical[key] = wrap_pos(x + dx, y + dy)
+    return canonical
+
+# =========================================================
+#  検証ロジック群
+# =========================================================
+
+# 1. 宣言した狙いが、距離的に近い方と一致しているか
+def verify_intention(dist_a_t, dist_b_t, llm_declared_target):
+    calculated_target = ""
+    if dist_a_t < dist_b_t:
+        calculated_target = "獲物A"
+    elif dist_b_t < dist_a_t:
+        calculated_target = "獲物B"
+    else:
+        return "△" # 距離同じ
+
+    if calculated_target in llm_declared_target:
+        return "⚪︎" # 一致
+    else:
+        return "✖️" # 不一致
+
+# 2. ★追加: Lv1が「推定した相手の獲物」と「異なる獲物」を狙っているか
+def verify_cooperation(lv1_declared_target, lv1_estimated_lv0_target):
+    # ターゲット名を抽出して比較
+    t1 = "獲物A" if "獲物A" in lv1_declared_target else ("獲物B" if "獲物B" in lv1_declared_target else None)
+    t_est = "獲物A" if "獲物A" in lv1_estimated_lv0_target else ("獲物B" if "獲物B" in lv1_estimated_lv0_target else None)
+
+    if t1 is None or t_est is None:
+        return "△" # 判定不能
+    
+    if t1 != t_est:
+        return "⚪︎" # 異なる獲物を狙っている（協調成功）
+    else:
+        return "✖️" # 同じ獲物を狙っている（被り）
+
+# 3. Lv1が推定した相手の獲物と、Lv0が実際に宣言した獲物が一致しているか（意図推定の正誤）
+def verify_estimation(lv1_estimated_lv0_target, lv0_declared_target):
+    t_est = "獲物A" if "獲物A" in lv1_estimated_lv0_target else ("獲物B" if "獲物B" in lv1_estimated_lv0_target else None)
+    t0 = "獲物A" if "獲物A" in lv0_declared_target else ("獲物B" if "獲物B" in lv0_declared_target else None)
+
+    if t_est is None or t0 is None:
+        return "△" # 判定不能
+
+    if t_est == t0:
+        return "⚪︎" # 推定が当たった
+    else:
+        return "✖️" # 推定が外れた
+
+# =========================================================
+#  同時リクエスト数の上限とレート制限時のバックオフ
+#  全エピソードの LLM 呼び出しが1つの limiter を共有する。
+#  429 が返ったら全体の再開時刻を後ろにずらすので、
+#  他のエピソードのリクエストも一緒に待つ。
+# =========================================================
+class RequestLimiter:
+    def __init__(self, max_in_flight=16, base_delay=1.0, max_delay=60.0):
+        self.max_in_flight = max_in_flight
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.resume_at = 0.0
+        self.rate_limited = 0
+        self._semaphore = None
+        self._jitter = random.Random()
+
+    def configure(self, max_in_flight):
+        self.max_in_flight = max_in_flight
+        self._semaphore = None
+
+    async def __aenter__(self):
+        # Semaphore は実行中のイベントループで作る
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_in_flight)
+        await self._semaphore.acquire()
+        try:
+            while (delay := self.resume_at - time.monotonic()) > 0:
+                await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            # 待っている間に取り消された（推測実行で不要になった など）ら枠を返す
+            self._semaphore.release()
+            raise
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self._semaphore.release()
+
+    def retry_delay(self, attempt):
+        """ジッター付きの指数バックオフ（base_delay * 2^attempt の 50〜100%）"""
+        delay = min(self.max_delay, self.base_delay * 2 ** attempt)
+        return delay * (0.5 + 0.5 * self._jitter.random())
+
+    def pause(self, delay):
+        """delay 秒後まで、全エピソードのリクエストを止める。"""
+        self.resume_at = max(self.resume_at, time.monotonic() + delay)
+
+    def back_off(self, attempt, retry_after=None):
+        delay = self.retry_delay(attempt) if retry_after is None else retry_after
+        self.pause(delay)
+        self.rate_limited += 1
+        return delay
+
+limiter = RequestLimiter()
+
+# =========================================================
+#  サーキットブレーカー
+#  失敗（タイムアウト・接続エラー・5xx・429 など）が failure_threshold 回続いたら、
+#  limiter を cooldown 秒止めてスケジューラ全体を一時停止する。
+#  止めている間の呼び出しは代替応答を返さずに待つので、
+#  障害中に「その場に留まる」ターンが量産されない。
+#  再開後もすぐ失敗したら、次の停止時間を倍にする（max_cooldown まで）。
+# =========================================================
+class CircuitBreaker:
+    def __init__(self, limiter, failure_threshold=5, cooldown=30.0, max_cooldown=300.0):
+        self.limiter = limiter
+        self.failure_threshold = failure_threshold
+        self.base_cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened = 0
+        self.opened_at = float("-inf")
+        self._tripped = False  # 直前に止めてから、まだ成功していない
+
+    def success(self):
+        self.failures = 0
+        self._tripped = False
+        self.cooldown = self.base_cooldown
+
+    def failure(self, started_at):
+        # 止める前に送られていたリクエストの失敗は、同じ障害の続きなので数えない
+        if started_at < self.opened_at:
+            return
+        self.failures += 1
+        # 再開直後の失敗はすぐに止め直す
+        if self.failures >= self.failure_threshold or (self._tripped and self.failures == 1):
+            if self._tripped:
+                self.cooldown = min(self.max_cooldown, self.cooldown * 2)
+            self.limiter.pause(self.cooldown)
+            self.opened_at = time.monotonic()
+            self.opened += 1
+            self._tripped = True
+            self.failures = 0
+            print(f"LLM の呼び出し失敗が続いたため、{self.cooldown:.0f}秒間すべてのリクエストを止めます。")
+
+breaker = CircuitBreaker(limiter)
+
+# 再試行する例外（タイムアウト・接続エラー・5xx・レート制限・JSON として読めない応答）
+RETRYABLE_ERRORS = (TimeoutError, APIConnectionError, InternalServerError, RateLimitError, json.JSONDecodeError)
+
+# 1リクエストの期限（limiter やブレーカーで待っている時間は含めない）と、再試行の上限
+call_timeout = 60.0
+call_max_retries = 5
+
+def _retry_after(error):
+    try:
+        return float(error.response.headers.get("retry-after"))
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+# =========================================================
+#  LLM API 呼び出し
+# =========================================================
+backend = None
+
+def set_backend(new_backend):
+    global backend
+    backend = new_backend
+    return backend
+
+def get_backend():
+    # 何も設定されていなければ実 API を使う
+    if backend is None:
+        set_backend(OpenAIBackend())
+    return backend
+
+# ===== 応答キャッシュ（enable_cache を呼んだときだけ使う） =====
+RESPONSE_FORMAT = {"type": "json_object"}
+cache = None
+
+def enable_cache(path=DEFAULT_CACHE_PATH, max_bytes=DEFAULT_MAX_BYTES):
+    global cache
+    cache = ResponseCache(path, max_bytes)
+    return cache
+
+# ===== まとめ送り（enable_batching を呼んだときだけ使う） =====
+batcher = None
+
+def enable_batching(max_batch=64, max_wait=0.005):
+    """backend がバッチ推論に対応していれば PromptBatcher を有効にして返す。"""
+    global batcher
+    llm = get_backend()
+    if not llm.supports_batch:
+        print(f"{llm.name} バックエンドはまとめ送りに対応していないため、1件ずつ送ります。")
+        return None
+    batcher = PromptBatcher(llm, limiter, max_batch, max_wait, timeout=call_timeout)
+    return batcher
+
+# 種類ごとのプロンプトトークン数・応答時間（API に実際に送った呼び出しだけ）
+token_stats = TokenStats()
+
+async def _complete(llm, kind, model, system_prompt, user_prompt):
+    if batcher is not None:
+        return await batcher.complete(kind, model, system_prompt, user_prompt, RESPONSE_FORMAT)
+    async with limiter:
+        return await asyncio.wait_for(llm.complete(model, system_prompt, user_prompt, RESPONSE_FORMAT), call_timeout)
+
+# 代替応答で決まったターンの判定欄に入れる印
+FALLBACK_MARK = "－"
+
+def fallback_result(reason="API Error"):
+    return {"狙っている獲物": "不明", "次の行動": "その場に留まる", "理由": reason, "他者の意図": "不明", "推定理由": "Error"}
+
+def _call_record(kind, model, start, usage=None, retries=0, status="ok", error=""):
+    usage = usage or {}
+    return {
+        "kind": kind,
+        "model": model,
+        "seconds": time.perf_counter() - start,
+        "prompt_tokens": usage.get("prompt_tokens", 0),
+        "completion_tokens": usage.get("completion_tokens", 0),
+        "cached_tokens": usage.get("cached_tokens", 0),
+        "retries": retries,
+        # ok / cache（キャッシュから返した） / error（代替応答を返した）
+        # discarded（推測実行で使わなかった） / cancelled（推測実行で応答前に取り消した）
+        "status": status,
+        "error": error,
+    }
+
+def _cancelled_record(kind, model, start, system_prompt, user_prompt, retries):
+    # 送った分のプロンプトは課金されうるので、概算トークン数とともに記録しておく
+    usage = {"prompt_tokens": count_tokens(system_prompt) + count_tokens(user_prompt)}
+    return _call_record(kind, model, start, usage, retries, status="cancelled")
+
+async def call_llm(system_prompt, user_prompt, model="gpt-4o-mini", max_retries=None, kind=None, calls=None):
+    """
+    kind: 呼び出しの種類（まとめ送りで同じ種類のプロンプトだけを束ねるのに使う）
+    calls: リストを渡すと、この呼び出しの計測値（時間・トークン数・再試行回数・成否）を追加する
+    再試行できる失敗は最大 max_retries 回までやり直し、それでも失敗したら代替応答を返す。
+    """
+    if max_retries is None:
+        max_retries = call_max_retries
+    llm = get_backend()
+    start = time.perf_counter()
+    record = None
+    key = None
+    if cache is not None:
+        key = cache.make_key(llm.cache_id(model), system_prompt, user_prompt, RESPONSE_FORMAT)
+        result = cache.get(key)
+        if result is not None:
+            record = _call_record(kind, model, start, status="cache")
+
+    attempt = 0
+    while record is None:
+        try:
+            request_start = time.perf_counter()
+            started_at = time.monotonic()
+            try:
+                text, usage = await _complete(llm, kind, model, system_prompt, user_prompt)
+            except asyncio.CancelledError:
+                if calls is not None:
+                    calls.append(_cancelled_record(kind, model, start, system_prompt, user_prompt, attempt))
+                raise
+            token_stats.record(kind, usage, time.perf_counter() - request_start)
+            breaker.success()
+            result = json.loads(text)
+            # 失敗時の代替応答はキャッシュしない
+            if key is not None:
+                cache.put(key, result)
+            record = _call_record(kind, model, start, usage, attempt)
+        except Exception as e:
+            error = type(e).__name__
+            # 応答が JSON でないのはモデル側の問題なので、ブレーカーには数えない
+            if not isinstance(e, json.JSONDecodeError):
+                breaker.failure(started_at)
+            if not isinstance(e, RETRYABLE_ERRORS) or attempt == max_retries:
+                print(f"LLM Error ({error}): {e}")
+                result = fallback_result()
+                record = _call_record(kind, model, start, retries=attempt, status="error", error=error)
+                break
+            if isinstance(e, RateLimitError):
+                # レート制限は全エピソードで一緒に待つ
+                delay = limiter.back_off(attempt, _retry_after(e))
+            else:
+                delay = limiter.retry_delay(attempt)
+                try:
+                    await asyncio.sleep(delay)
+                except asyncio.CancelledError:
+                    # 再試行待ちの間に取り消された（推測実行の使わない枝など）ときも記録を残す
+                    if calls is not None:
+                        calls.append(_cancelled_record(kind, model, start, system_prompt, user_prompt, attempt + 1))
+                    raise
+            attempt += 1
+            print(f"LLM Error ({error}). {delay:.1f}秒待って再試行します ({attempt}/{max_retries})")
+
+    if calls is not None:
+        calls.append(record)
+    return result
+
+async def estimate_opponent_intention(state_info, calls=None):
+    return await call_llm(system_prompt("estimate"), user_payload(state_info), kind="estimate", calls=calls)
+
+async def decide_cooperative_action(state_info, opponent_intention_result, calls=None):
+    return await call_llm(system_prompt("cooperative"), user_payload(state_info, opponent_intention_result),
+                          kind="cooperative", calls=calls)
+
+async def decide_solo_action(state_info, calls=None):
+    return await call_llm(system_prompt("solo"), user_payload(state_info), kind="solo", calls=calls)
+
+async def decide_fused_action(state_info, calls=None):
+    """意図推定と協調行動の決定を1回の呼び出しで行う（他者の意図・推定理由・狙っている獲物・次の行動・理由）"""
+    return await call_llm(system_prompt("fused"), user_payload(state_info), kind="fused", calls=calls)
+
+# =========================================================
+#  1ターン分の LLM 呼び出し
+#  Lv0 の行動決定と Lv1 の意図推定は互いに独立なので同時に投げ、
+#  Lv1 の行動決定だけが意図推定の結果を待つ（直列 3 往復 → 2 往復）。
+#  lv1_mode="fused" では Lv1 が推定と行動決定を1回で返すので、Lv0 と並んで 1 往復で済む。
+#  その場合は同じ応答を意図推定の結果としても使う。
+#  lv1_mode="speculative" では推定の結果を待たずに、他者の意図が「獲物A」「獲物B」それぞれの
+#  場合の協調行動を意図推定と同時に投げ、推定と合う方を使う（Lv1 も 1 往復）。
+# =========================================================
+LV1_MODES = ("two-call", "fused", "speculative")
+default_lv1_mode = "two-call"  # 実行全体の既定値（HunterEpisode ごとに上書きできる）
+
+async def decide_turn(state_info_p1, state_info_p2, calls=None, mode=None):
+    if (mode or default_lv1_mode) == "fused":
+        p2_result, p1_result = await asyncio.gather(
+            decide_solo_action(state_info_p2, calls),
+            decide_fused_action(state_info_p1, calls),
+        )
+        return p2_result, p1_result, p1_result
+
+    if (mode or default_lv1_mode) == "speculative":
+        return await decide_turn_speculative(state_info_p1, state_info_p2, calls)
+
+    p2_result, p2_intention = await asyncio.gather(
+        decide_solo_action(state_info_p2, calls),
+        estimate_opponent_intention(state_info_p1, calls),
+    )
+    p1_result = await decide_cooperative_action(state_info_p1, p2_intention, calls)
+    return p2_result, p2_intention, p1_result
+
+# 推測実行で先に投げる「他者の意図」の候補（推定理由は推定が終わるまで分からないので空）
+SPECULATIVE_INTENTIONS = {
+    name: {"他者の意図": f"{name}を狙っている", "推定理由": ""} for name in ("獲物A", "獲物B")
+}
+
+def prey_name(text):
+    """"獲物A" / "獲物B" のどちらを指しているか（どちらでもなければ None）"""
+    return "獲物A" if "獲物A" in text else ("獲物B" if "獲物B" in text else None)
+
+async def decide_turn_speculative(state_info_p1, state_info_p2, calls=None):
+    """
+    意図推定と同時に、候補ごとの協調行動を投げておく。推定と合わない方は取り消し、
+    すでに応答済みなら捨てる（どちらも calls に discarded / cancelled として残し、追加コストを数えられるようにする）。
+    推定が「不明」などで候補に当てはまらなければ、推定結果で改めて協調行動を決める。
+    """
+    branch_calls = {name: [] for name in SPECULATIVE_INTENTIONS}
+    branches = {
+        name: asyncio.ensure_future(decide_cooperative_action(state_info_p1, intention, branch_calls[name]))
+        for name, intention in SPECULATIVE_INTENTIONS.items()
+    }
+    try:
+        p2_result, p2_intention = await asyncio.gather(
+            decide_solo_action(state_info_p2, calls),
+            estimate_opponent_intention(state_info_p1, calls),
+        )
+        guess = prey_name(p2_intention.get("他者の意図", ""))
+        for name, task in branches.items():
+            if name != guess:
+                task.cancel()
+        if guess is not None:
+            p1_result = await branches[guess]
+        else:
+            p1_result = await decide_cooperative_action(state_info_p1, p2_intention, calls)
+    finally:
+        for task in branches.values():
+            task.cancel()
+        await asyncio.gather(*branches.values(), return_exceptions=True)
+
+    if calls is not None:
+        for name, records in branch_calls.items():
+            for record in records:
+                if name != guess and record["status"] in ("ok", "error"):
+                    record["status"] = "discarded"
+                calls.append(record)
+    return p2_result, p2_intention, p1_result
+
+def apply_action(x, y, action):
+    dxy = ACTION_TO_DXY.get(action, (0, 0))
+    return wrap_pos(x + dxy[0], y + dxy[1])
+
+# =========================================================
+#  1エピソード分の状態
+#  P1 = Lv1（協調）、P2 = Lv0（単独）。乱数はシードから派生した EpisodeStreams だけを使うので、
+#  他のエピソードと並行して進めても同じシードなら同じ獲物の動きになる。
+#  play_turn はターンを1つずつ順番に進める（同じエピソードのターンを並行させない）。
+# =========================================================
+class HunterEpisode:
+    def __init__(self, episode_id, seed, max_turns=MAX_TURNS, lv1_mode=None):
+        self.episode_id = episode_id
+        self.seed = seed
+        self.max_turns = max_turns
+        self.lv1_mode = lv1_mode or default_lv1_mode
+        # 初期配置と各獲物の移動で別々の乱数系列を使う
+        self.streams = EpisodeStreams(seed)
+        self.p1, self.p2, self.preyA, self.preyB = sample_non_overlapping_positions(4, self.streams.placement)
+        self.hunt1, self.hunt2 = False, False
+        self.turn = 0
+        self.done = False
+        self.note = ""
+
+    async def play_turn(self, logger, verbose=True):
+        self.turn += 1
+        hunt1, hunt2 = self.hunt1, self.hunt2
+
+        state_info_p1 = make_state_info(self.p1, self.p2, self.preyA, self.preyB, hunt1, hunt2)
+        state_info_p2 = make_state_info(self.p2, self.p1, self.preyA, self.preyB, hunt1, hunt2)
+        if canonical_states:
+            state_info_p1 = canonicalize_state(state_info_p1)
+            state_info_p2 = canonicalize_state(state_info_p2)
+
+        # 行動決定（各 LLM 呼び出しの計測値を llm_calls に集める）
+        llm_calls = []
+        turn_start = time.perf_counter()
+        p2_result, p2_intention, p1_result = await decide_turn(state_info_p1, state_info_p2, llm_calls, self.lv1_mode)
+        turn_seconds = time.perf_counter() - turn_start
+        p2_action = p2_result.get("次の行動", "その場に留まる")
+        p2_declared_target = p2_result.get("狙っている獲物", "不明")
+
+        p1_action = p1_result.get("次の行動", "その場に留まる")
+        p1_declared_target = p1_result.get("狙っている獲物", "不明")
+        p1_estimated_p2_target = p2_intention.get("他者の意図", "不明") # 推定結果
+
+        # 距離計算
+        lv0_pos = self.p2
+        lv1_pos = self.p1
+        a_pos = self.preyA
+        b_pos = self.preyB
+
+        dists = {
+            "d0_a_m": calc_manhattan(lv0_pos, a_pos),
+            "d0_a_t": calc_torus_manhattan(lv0_pos, a_pos, GRID_W, GRID_H),
+            "d0_b_m": calc_manhattan(lv0_pos, b_pos),
+            "d0_b_t": calc_torus_manhattan(lv0_pos, b_pos, GRID_W, GRID_H),
+            "d1_a_m": calc_manhattan(lv1_pos, a_pos),
+            "d1_a_t": calc_torus_manhattan(lv1_pos, a_pos, GRID_W, GRID_H),
+            "d1_b_m": calc_manhattan(lv1_pos, b_pos),
+            "d1_b_t": calc_torus_manhattan(lv1_pos, b_pos, GRID_W, GRID_H),
+        }
+
+        # 検証
+        lv0_check = verify_intention(dists["d0_a_t"], dists["d0_b_t"], p2_declared_target)
+        lv1_check = verify_intention(dists["d1_a_t"], dists["d1_b_t"], p1_declared_target)
+        # 協調判定 (推定した相手の狙い != 自分の狙い ならOK)
+        lv1_coop_check = verify_cooperation(p1_declared_target, p1_estimated_p2_target)
+        # 意図推定の正誤 (推定した相手の狙い == 相手が宣言した狙い ならOK)
+        lv1_intent_check = verify_estimation(p1_estimated_p2_target, p2_declared_target)
+
+        # 代替応答（API エラー）で決まった行動は判定しない（本当の判断に見せない）
+        fallback_kinds = {c["kind"] for c in llm_calls if c["status"] == "error"}
+        if "solo" in fallback_kinds:
+            lv0_check = FALLBACK_MARK
+        if fallback_kinds & {"cooperative", "fused"}:
+            lv1_check = FALLBACK_MARK
+        if fallback_kinds & {"estimate", "cooperative", "fused"}:
+            lv1_coop_check = FALLBACK_MARK
+        if fallback_kinds & {"estimate", "fused", "solo"}:
+            lv1_intent_check = FALLBACK_MARK
+
+        # ログ記録
+        lv1_log_info = {
+            "intent": p1_estimated_p2_target,
+            "intent_reason": p2_intention.get("推定理由", ""),
+            "action": p1_action,
+            "action_reason": p1_result.get("理由", ""),
+            "target_declared": p1_declared_target
+        }
+        lv0_log_info = {
+            "target_declared": p2_declared_target,
+            "action": p2_action,
+            "action_reason": p2_result.get("理由", "")
+        }
+
+        logger.add_turn_log(
+            episode_id=self.episode_id,
+            current_turn=self.turn,
+            seed=self.seed,
+            lv1_info=lv1_log_info,
+            lv0_info=lv0_log_info,
+            pos_lv1=lv1_pos,
+            pos_lv0=lv0_pos,
+            pos_prey_a=a_pos,
+            pos_prey_b=b_pos,
+            dists=dists,
+            lv0_verification=lv0_check,
+            lv1_verification=lv1_check,
+            lv1_coop_check=lv1_coop_check,
+            lv1_intent_check=lv1_intent_check,
+            lv1_mode=self.lv1_mode,
+            llm_calls=llm_calls,
+            turn_seconds=turn_seconds
+        )
+
+        # コンソール出力
+        if verbose:
+            print("==================================================================")
+            print(f"Ep:{self.episode_id} Turn: {self.turn} | Seed:{self.seed}")
+            print(f"PreyA:{'HOLD' if hunt1 else 'FREE'} | PreyB:{'HOLD' if hunt2 else 'FREE'}")
+            if fallback_kinds:
+                print(f"  ※ 代替応答のターン: {', '.join(sorted(fallback_kinds))}")
+
+            print(f"-- P1 (Lv1: 協調) --")
+            print(f"  行動: {p1_action} (狙い: {p1_declared_target} -> 近い?: {lv1_check})")
+            print(f"  [意図推定]: P2は「{lv1_log_info['intent']}」")
+            print(f"  [協調判定]: 推定と違う獲物? -> {lv1_coop_check}")
+            print(f"  [推定の正誤]: P2の宣言と一致? -> {lv1_intent_check}")
+            print(f"  理由: {lv1_log_info['action_reason']}")
+            print(f"  推定理由: {lv1_log_info['intent_reason']}")
+
+            print(f"-- P2 (Lv0: 単独) --")
+            print(f"  行動: {p2_action} (狙い: {p2_declared_target} -> 近い?: {lv0_check})")
+            print(f"  理由: {lv0_log_info['action_reason']}")
+            print("==================================================================")
+
+        self.p1 = apply_action(*self.p1, p1_action)
+        self.p2 = apply_action(*self.p2, p2_action)
+
+        self.hunt1 = self.p1 == self.preyA or self.p2 == self.preyA
+        self.hunt2 = self.p1 == self.preyB or self.p2 == self.preyB
+
+        if (self.hunt1 and self.hunt2) or self.turn >= self.max_turns:
+            self.done = True
+            self.note = "Clear" if (self.hunt1 and self.hunt2) else "TimeUp"
+            if verbose:
+                print(f"\n--- Ep {self.episode_id} Finished: {self.note} ---")
+            await logger.log_episode_end_async(episode_id=self.episode_id, final_turn=self.turn, seed=self.seed, result_note=self.note)
+            return
+
+        # 獲物の乱数は止まっているステップでも引き、LLM の応答が変わっても同じ時刻に同じ値を使う
+        r1, r2 = self.streams.prey[0].random(), self.streams.prey[1].random()
+        if not self.hunt1: self.preyA = move_prey(*self.preyA, r1)
+        if not self.hunt2: self.preyB = move_prey(*self.preyB, r2)
@@ -0,0 +1,156 @@
+import argparse
+import asyncio
+import sys
+import time
+import matplotlib
+matplotlib.use("Agg")
+
+from dotenv import load_dotenv
+from llm_backend import create_backend
+import llm_hunter
+from llm_hunter import GRID_W, GRID_H, HunterEpisode, set_backend, enable_cache, enable_batching, limiter
+from llm_cache import DEFAULT_CACHE_PATH
+from parallel_eval import load_replay_seeds, generate_seeds
+from simulation_logger import SimulationLogger
+
+# =========================================================
+#  LLM エピソードの並行実行スケジューラ
+#  K 個のエピソードを同時に進める。各エピソードは自分のシードと状態を持ち、
+#  ターンは1つずつ順番に進む（前のターンの行動が次の観測になるため）。
+#  LLM へのリクエストは全エピソードで RequestLimiter（同時実行数の上限と
+#  レート制限時のバックオフ）を共有する。
+# =========================================================
+
+async def run_episode(episode, logger, verbose=False):
+    while not episode.done:
+        await episode.play_turn(logger, verbose=verbose)
+    return episode
+
+async def run_episodes(seeds, logger, concurrency=8, verbose=False):
+    """
+    seeds の各シードで1エピソードずつ、最大 concurrency 個を同時に実行する。
+    エピソード番号はシード列の順番（1始まり）。
+    """
+    slots = asyncio.Semaphore(concurrency)
+
+    batcher = llm_hunter.batcher
+    # verbose でないときは、エピソードごとの開始・終了の表示の代わりに 10% ごとの進捗だけを出す
+    finished = 0
+    report_every = max(1, len(seeds) // 10)
+
+    async def run_one(ep_num, seed):
+        nonlocal finished
+        async with slots:
+            if verbose:
+                print(f">>> Episode {ep_num} Start | Seed: {seed} <<<")
+            # まとめ送りは並行中のエピソード全員分がそろった時点で送る
+            if batcher:
+                batcher.active += 1
+            try:
+                episode = await run_episode(HunterEpisode(ep_num, seed), logger, verbose)
+            finally:
+                if batcher:
+                    batcher.active -= 1
+            finished += 1
+            if not verbose and (finished % report_every == 0 or finished == len(seeds)):
+                print(f"進捗: {finished}/{len(seeds)} エピソード終了")
+            return episode
+
+    return await asyncio.gather(*(run_one(i, seed) for i, seed in enumerate(seeds, start=1)))
+
+def sort_logs(logger):
+    """
+    並行実行で混ざったログをエピソード順・ターン順に並べ直す。
+    詳細ログを逐次書き出している場合、ファイル上はエピソードが終わった順に並ぶ（各エピソード内はターン順）。
+    """
+    logger.turn_logs.sort(key=lambda log: (log["Episode_ID"], log["現在のターン"]))
+    logger.episode_results.sort(key=lambda r: r["Episode_ID"])
+
+# =========================================================
+#  コマンドライン実行
+# =========================================================
+def main():
+    parser = argparse.ArgumentParser(description="LLM ハンタータスクの並行実行")
+    parser.add_argument("--episodes", type=int, default=20)
+    parser.add_argument("--seeds-csv", default=None, help="Seed 列を読む summary_stats_*.csv（.parquet も可）")
+    parser.add_argument("--seed", type=int, default=None, help="シード列を生成するための親シード")
+    parser.add_argument("--concurrency", type=int, default=8, help="同時に進めるエピソード数 K")
+    parser.add_argument("--max-in-flight", type=int, default=16, help="全体で同時に投げる LLM リクエスト数の上限")
+    parser.add_argument("--timeout", type=float, default=60.0, help="LLM リクエスト1件の期限（秒）")
+    parser.add_argument("--max-retries", type=int, default=5, help="再試行できる失敗をやり直す上限回数")
+    parser.add_argument("--breaker-threshold", type=int, default=5, help="この回数失敗が続いたら全リクエストを止める")
+    parser.add_argument("--breaker-cooldown", type=float, default=30.0, help="失敗が続いたときに止める秒数")
+    parser.add_argument("--backend", choices=["openai", "heuristic"], default="openai",
+                        help="heuristic: API を使わずトーラス距離の規則で答える代役")
+    parser.add_argument("--latency", type=float, default=0.0, help="heuristic の応答待ち時間（秒）")
+    parser.add_argument("--jitter", type=float, default=0.0, help="heuristic の応答待ち時間に加える 0〜jitter 秒の揺らぎ")
+    parser.add_argument("--lv1-mode", choices=llm_hunter.LV1_MODES, default="two-call",
+                        help="fused: Lv1 の意図推定と行動決定を1回の呼び出しで行う / "
+                             "speculative: 意図推定と同時に候補ごとの行動決定を投げ、推定と合う方を使う")
+    parser.add_argument("--canonical", action="store_true",
+                        help="自分が盤面の中央に来るように平行移動した観測を LLM に渡す（キャッシュに当たりやすくなる）")
+    parser.add_argument("--batch", action="store_true", help="同じ種類のプロンプトをエピソードをまたいでまとめて送る（バッチ推論対応の backend のみ）")
+    parser.add_argument("--max-batch", type=int, default=64, help="まとめ送り1回の最大プロンプト数")
+    parser.add_argument("--no-cache", action="store_true", help="LLM 応答キャッシュを使わない")
+    parser.add_argument("--cache-path", default=DEFAULT_CACHE_PATH)
+    parser.add_argument("--cache-max-mb", type=float, default=256, help="キャッシュの上限サイズ（超えたら古いものから削除）")
+    parser.add_argument("--verbose", action="store_true", help="ターンごとの詳細を表示する")
+    parser.add_argument("--detail-log", default="detailed_log.csv",
+                        help=".parquet にすると列指向（Parquet）で保存する（--no-stream と一緒に使う）")
+    parser.add_argument("--no-stream", action="store_true",
+                        help="詳細ログを逐次書き出さず、最後にまとめて保存する（全ターンをメモリに持つ）")
+    parser.add_argument("--reasoning-store", default=None,
+                        help="理由文を詳細ログから外し、このファイルに zstd 圧縮して保存する（reasoning_store.sqlite3 など）")
+    parser.add_argument("--flush-episodes", type=int, default=4, help="詳細ログを書き出すエピソード数の単位")
+    parser.add_argument("--summary-stats", default="summary_stats.csv", help=".parquet にするとエピソード表を Parquet で保存する")
+    parser.add_argument("--graph", default="episode_steps_graph.png")
+    args = parser.parse_args()
+    if args.detail_log.endswith(".parquet") and not args.no_stream:
+        # Parquet は閉じるまで読めないので、途中で止まったときに残るログにならない
+        parser.error("--detail-log に .parquet を使うときは --no-stream を付けてください（逐次書き出しは CSV のみ）")
+
+    load_dotenv()
+    try:
+        set_backend(create_backend(args.backend, args.latency, args.jitter))
+    except Exception:
+        print("エラー: OPENAI_API_KEYが設定されていません。")
+        sys.exit()
+
+    if args.seeds_csv:
+        seeds = load_replay_seeds(args.seeds_csv)[:args.episodes]
+        print(f"CSVから {len(seeds)} 件のシード値を読み込みました。")
+    else:
+        seeds = generate_seeds(args.episodes, args.seed)
+
+    limiter.configure(args.max_in_flight)
+    llm_hunter.call_timeout = args.timeout
+    llm_hunter.call_max_retries = args.max_retries
+    llm_hunter.default_lv1_mode = args.lv1_mode
+    llm_hunter.canonical_states = args.canonical
+    llm_hunter.breaker.failure_threshold = args.breaker_threshold
+    llm_hunter.breaker.base_cooldown = llm_hunter.breaker.cooldown = args.breaker_cooldown
+    batcher = enable_batching(args.max_batch) if args.batch else None
+    cache = None if args.no_cache else enable_cache(args.cache_path, int(args.cache_max_mb * 1024 * 1024))
+    logger = SimulationLogger(map_width=GRID_W, map_height=GRID_H,
+                              stream_path=None if args.no_stream else args.detail_log,
+                              flush_episodes=args.flush_episodes,
+                              reasoning_path=args.reasoning_store)
+
+    start = time.perf_counter()
+    asyncio.run(run_episodes(seeds, logger, args.concurrency, args.verbose))
+    elapsed = time.perf_counter() - start
+    print(f"\n=== 全エピソード終了: {len(seeds)} エピソード / {elapsed:.1f} 秒 "
+          f"(レート制限による待機 {limiter.rate_limited} 回, ブレーカー作動 {llm_hunter.breaker.opened} 回) ===")
+    print(f"{logger.turn_count} ターン / {logger.turn_count / elapsed:,.0f} ターン/秒")
+    print(llm_hunter.token_stats.summary())
+    if batcher:
+        print(batcher.summary())
+    if cache:
+        print(cache.summary())
+
+    sort_logs(logger)
+    logger.save_all_logs(args.detail_log, args.summary_stats)
+    logger.save_steps_graph(args.graph)
+
+if __name__ == "__main__":
+    main()
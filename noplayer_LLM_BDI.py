@@ -2,13 +2,64 @@ import pygame
 import sys
 import random
 import json
-import os
-from openai import OpenAI
+import asyncio
 from dotenv import load_dotenv
+from llm_backend import HeuristicBackend, OpenAIBackend
 
 # ====== 環境変数読み込み ======
+# --offline: API の代わりにトーラス距離で答える代役（HeuristicBackend）を使う
+OFFLINE = "--offline" in sys.argv
 load_dotenv()
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+try:
+    # 1ターン内の呼び出しは少数なので、再試行は従来どおり SDK に任せる
+    backend = HeuristicBackend() if OFFLINE else OpenAIBackend(max_retries=2)
+except Exception:
+    print("エラー: OPENAI_API_KEYが設定されていません。")
+    sys.exit()
+# AsyncOpenAI の接続を使い回すため、イベントループは実行全体で1つにする
+loop = asyncio.new_event_loop()
+
+# =========================================================
+#  構造化出力（JSON スキーマ）
+#  各段の応答を response_format の json_schema で縛り、キーと行動の値を固定する。
+#  それでも読めなかった応答は、警告を出したうえで既定値（その場に留まる など）にする。
+# =========================================================
+ACTIONS = ["上", "下", "左", "右", "その場に留まる"]
+
+def json_schema_format(name, properties):
+    return {
+        "type": "json_schema",
+        "json_schema": {
+            "name": name,
+            "strict": True,
+            "schema": {
+                "type": "object",
+                "properties": properties,
+                "required": list(properties),
+                "additionalProperties": False,
+            },
+        },
+    }
+
+INTENTION_FORMAT = json_schema_format("opponent_intention", {"他者の意図": {"type": "string"}})
+SELF_INTENTION_FORMAT = json_schema_format("self_intention", {"自己の意図": {"type": "string"}})
+ACTION_FORMAT = json_schema_format("action", {
+    "次の行動": {"type": "string", "enum": ACTIONS},
+    "理由": {"type": "string"},
+})
+
+async def call_backend(system_prompt, user_prompt, response_format, defaults, model="gpt-4o-mini"):
+    """応答を dict で返す。読めない・キーが足りない・行動が選択肢にないときは defaults で埋める。"""
+    text, _ = await backend.complete(model, system_prompt, user_prompt, response_format)
+    try:
+        result = json.loads(text)
+    except json.JSONDecodeError:
+        print(f"警告: JSON として読めない応答のため既定値を使います ({response_format['json_schema']['name']}): {text!r}")
+        return dict(defaults)
+    if "次の行動" in defaults and result.get("次の行動") not in ACTIONS:
+        print(f"警告: 選択肢にない行動のため既定値を使います: {result.get('次の行動')!r}")
+        result["次の行動"] = defaults["次の行動"]
+    return {**defaults, **result}
 
 # ====== Pygame初期化 ======
 pygame.init()
@@ -71,7 +122,7 @@ print(f"現在の設定: Player1(Lv{LV1}) / Player2(Lv{LV2})")
 # =========================================================
 #  ① 他者の意図推定（state_infoのみを入力：BDI説明含む）
 # =========================================================
-def estimate_opponent_intention(state_info):
+async def estimate_opponent_intention(state_info):
     system_prompt = f"""
     あなたは意図推定システムです。私が指示した以外の返答は一切不要です。
     これ以降、意図推定システムであるあなた自身のことを「自己」、協力相手であるもう一体のハンターを「他者」と呼びます。
@@ -136,20 +187,8 @@ def estimate_opponent_intention(state_info):
 
     user_prompt = f"""{json.dumps(state_info, ensure_ascii=False, indent=2)}"""
 
-    response = client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=[
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_prompt},
-        ]
-    )
-
-    text = response.choices[0].message.content
-    try:
-        result = json.loads(text)
-        inferred_intention = result.get("他者の意図", "不明")
-    except Exception:
-        inferred_intention = text
+    result = await call_backend(system_prompt, user_prompt, INTENTION_FORMAT, {"他者の意図": "不明"})
+    inferred_intention = result["他者の意図"]
     print("他者の意図:", inferred_intention)
     return inferred_intention
 
@@ -157,7 +196,7 @@ def estimate_opponent_intention(state_info):
 # =========================================================
 #  ② 自己の意図生成（BDI説明付き）
 # =========================================================
-def generate_self_intention(state_info, self_beliefs, self_desires, opponent_intention):
+async def generate_self_intention(state_info, self_beliefs, self_desires, opponent_intention):
     system_prompt = f"""
 あなたは意図生成システムです。私が指示した以外の返答は一切不要です。
 これ以降、意図生成システムであるあなたを「自己」、協力相手であるもう一体のハンターを「他者」と呼びます。
@@ -240,20 +279,8 @@ def generate_self_intention(state_info, self_beliefs, self_desires, opponent_int
 指定JSONのみを返してください。
 """.strip()
 
-    response = client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=[
-            {"role": "system", "content": system_prompt},
-            {"role": "user",   "content": user_prompt},
-        ]
-    )
-
-    text = response.choices[0].message.content
-    try:
-        result = json.loads(text)
-        self_intention = result.get("自己の意図", "不明")
-    except Exception:
-        self_intention = text
+    result = await call_backend(system_prompt, user_prompt, SELF_INTENTION_FORMAT, {"自己の意図": "不明"})
+    self_intention = result["自己の意図"]
     print("自己の意図:", self_intention)
     return self_intention
 
@@ -261,7 +288,7 @@ def generate_self_intention(state_info, self_beliefs, self_desires, opponent_int
 # =========================================================
 #  ③ 行動決定（BDI説明付き）
 # =========================================================
-def decide_action(state_info, self_intention, opponent_intention):
+async def decide_action(state_info, self_intention, opponent_intention):
     system_prompt = f"""
 あなたはハンタータスクの行動決定システムです。私が指示した以外の返答は一切不要です。
 これ以降、あなた自身を「自己」、協力相手のもう一体のハンターを「他者」と呼びます。
@@ -324,20 +351,26 @@ def decide_action(state_info, self_intention, opponent_intention):
 指定のJSONのみを返してください。
 """.strip()
 
-    response = client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=[
-            {"role": "system", "content": system_prompt},
-            {"role": "user",   "content": prompt},
-        ]
-    )
+    return await call_backend(system_prompt, prompt, ACTION_FORMAT,
+                              {"次の行動": "その場に留まる", "理由": "応答を読めなかったため"})
 
-    text = response.choices[0].message.content
-    try:
-        result = json.loads(text)
-        return result
-    except Exception:
-        return {"次の行動": "不明", "理由": text}
+
+# =========================================================
+#  1ターン分の呼び出しグラフ
+#  P2（Lv0）の行動決定は P1 の結果に依存しないので、P1（Lv1）の
+#  意図推定 → 自己意図生成 → 行動決定 の連鎖と同時に投げる（直列 4 往復 → 3 往復）。
+# =========================================================
+async def decide_lv1_action(state_info, self_beliefs, self_desires):
+    opponent_intention = await estimate_opponent_intention(state_info)
+    self_intention = await generate_self_intention(state_info, self_beliefs, self_desires, opponent_intention)
+    return await decide_action(state_info, self_intention, opponent_intention)
+
+async def decide_turn(state_info_p1, state_info_p2, self_beliefs, self_desires):
+    """(P1 の行動決定結果, P2 の行動決定結果) を返す。"""
+    return await asyncio.gather(
+        decide_lv1_action(state_info_p1, self_beliefs, self_desires),
+        decide_action(state_info_p2, "なし", "不明"),
+    )
 
 
 # =========================================================
@@ -368,18 +401,13 @@ while True:
         (prey1_x, prey1_y), (prey2_x, prey2_y)
     )  # プレイヤー2視点（自己=player2）
 
-    # --- プレイヤー2（Lv0想定）：意図推定なしで行動決定（自分視点のstateで）
-    opponent_action = decide_action(state_info_p2, "なし", "不明")["次の行動"]
-
     # --- プレイヤー1（Lv1）：意図推定 → 自己意図生成 → 行動決定
-    opponent_intention = estimate_opponent_intention(state_info_p1)
-
-    self_intention = generate_self_intention(
-        state_info_p1, self_beliefs_default, self_desires_default, opponent_intention
-    )
-
-    result = decide_action(state_info_p1, self_intention, opponent_intention)
+    # --- プレイヤー2（Lv0想定）：意図推定なしで行動決定（自分視点のstateで）。P1 の連鎖と同時に実行
+    result, opponent_result = loop.run_until_complete(decide_turn(
+        state_info_p1, state_info_p2, self_beliefs_default, self_desires_default
+    ))
     own_action = result["次の行動"]
+    opponent_action = opponent_result["次の行動"]
 
     # === 行動の適用 ===
     def apply_action(x, y, action):
@@ -1,22 +1,25 @@
-import pygame
 import sys
 import random
+import matplotlib
+
+# ===== 実行モード =====
+# --headless: pygame を一切使わず、描画なしの最高速でシミュレーションする
+HEADLESS = "--headless" in sys.argv
+if HEADLESS:
+    matplotlib.use("Agg")
+# --trajectory: 全ステップを trajectory.bin（trajectory_store 形式のバイナリ）に追記する
+TRAJECTORY = "--trajectory" in sys.argv
+TRAJECTORY_FILE = "trajectory.bin"
+
 import matplotlib.pyplot as plt
 from matplotlib.ticker import MultipleLocator
-import pickle
 import os
+import numpy as np
 import pandas as pd
-
-# ===== Pygame初期化 =====
-pygame.init()
-
-# 画面設定
-SCREEN_WIDTH, SCREEN_HEIGHT = 900, 640
-TILE_SIZE = 32
-WHITE = (255, 255, 255)
-
-screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
-pygame.display.set_caption("Hunter Task - Q-Table (Graph: Steps Only)")
+from qtable import QTable
+from greedy_policy import GreedyPolicy, decide_lv0_action, decide_lv1_action
+from rng_streams import EpisodeStreams
+from trajectory_store import TrajectoryWriter, make_record
 
 # ===== マップ設定 =====
 map_data = [[0 for _ in range(20)] for _ in range(20)]
@@ -40,44 +43,37 @@ except Exception as e:
     print(f"CSV読み込みエラー: {e}")
     REPLAY_SEEDS = [random.randint(0, 100000) for _ in range(20)]
 
-# ===== 画像読み込み =====
-def load_scaled(path):
-    if not os.path.exists(path):
-        surf = pygame.Surface((TILE_SIZE, TILE_SIZE))
-        surf.fill((128, 128, 128))
-        return surf
-    img = pygame.image.load(path)
-    return pygame.transform.scale(img, (TILE_SIZE, TILE_SIZE))
-
-ground_img = load_scaled("images/ground.png")
-player1_img = load_scaled("images/player1.png")
-player2_img = load_scaled("images/player2.png")
-prey1_img = load_scaled("images/prey1.png")
-prey2_img = load_scaled("images/prey2.png")
-
-font = pygame.font.SysFont(None, 24)
+# ===== 描画（オブザーバ） =====
+if HEADLESS:
+    renderer = None
+else:
+    from renderer import HunterRenderer
+    renderer = HunterRenderer("Hunter Task - Q-Table (Graph: Steps Only)", GRID_W, GRID_H)
 
 # ===== Qテーブル読み込み =====
 load_path1 = os.path.join(os.path.dirname(__file__), "q_table.pkl")
 load_path2 = os.path.join(os.path.dirname(__file__), "q_table.pkl2")
 
-Q1 = {}
-Q2 = {}
+# 辞書版と最大値・同点の判定を完全に揃えるため float64 で読み込む
+Q1 = QTable(GRID_W, GRID_H, dtype=np.float64)
+Q2 = QTable(GRID_W, GRID_H, dtype=np.float64)
 
 if os.path.exists(load_path1):
-    with open(load_path1, "rb") as f:
-        Q1 = pickle.load(f)
+    Q1 = QTable.load(load_path1, GRID_W, GRID_H, dtype=np.float64)
     print("Q1 (Lv0) loaded.")
 else:
     print("Warning: q_table.pkl not found.")
 
 if os.path.exists(load_path2):
-    with open(load_path2, "rb") as f:
-        Q2 = pickle.load(f)
+    Q2 = QTable.load(load_path2, GRID_W, GRID_H, dtype=np.float64)
     print("Q2 (Lv1) loaded.")
 else:
     print("Warning: q_table.pkl2 not found.")
 
+# 評価中は Qテーブルが固定なので、各相対状態の最善行動を事前計算しておく
+policy1 = GreedyPolicy(Q1)
+policy2 = GreedyPolicy(Q2)
+
 # ===== パラメータ =====
 ACTION_TO_DXY = {
     "UP":    (0, -1),
@@ -91,87 +87,20 @@ ACTIONS = list(ACTION_TO_DXY.keys())
 # ログ用リスト
 raw_intention_log = []   # 全ステップ詳細
 episode_summary_log = [] # エピソードごとのまとめ
+trajectory_writer = TrajectoryWriter(TRAJECTORY_FILE) if TRAJECTORY else None
 
 # ===== ユーティリティ関数 =====
 def wrap_pos(x, y, w, h):
     return x % w, y % h
 
-def move_prey(x, y):
-    r = random.random()
+def move_prey(x, y, r):
     if r < 0.2: y -= 1
     elif r < 0.6: x += 1
     return wrap_pos(x, y, GRID_W, GRID_H)
 
-def draw_map():
-    for row in range(GRID_H):
-        for col in range(GRID_W):
-            screen.blit(ground_img, (col * TILE_SIZE, row * TILE_SIZE))
-
-def draw_player(img, x, y): screen.blit(img, (x * TILE_SIZE, y * TILE_SIZE))
-def draw_prey(img, x, y): screen.blit(img, (x * TILE_SIZE, y * TILE_SIZE))
-
-def sample_non_overlapping_positions(n):
+def sample_non_overlapping_positions(n, rng=random):
     all_positions = [(x, y) for x in range(GRID_W) for y in range(GRID_H)]
-    return random.sample(all_positions, n)
-
-# ===== 相対座標計算 =====
-def get_relative_state(px, py, tx, ty, w, h):
-    dx = tx - px
-    dy = ty - py
-    if dx > w / 2: dx -= w
-    elif dx < -w / 2: dx += w
-    if dy > h / 2: dy -= h
-    elif dy < -h / 2: dy += h
-    return (dx, dy)
-
-# ===== 純粋なQ値参照 =====
-def get_action_pure_q(q_table, px, py, tx, ty):
-    rel_state = get_relative_state(px, py, tx, ty, GRID_W, GRID_H)
-    q_vals = q_table.get(rel_state, {a: 0.0 for a in ACTIONS})
-    max_q = max(q_vals.values())
-    best_actions = [a for a, q in q_vals.items() if q == max_q]
-    selected_action = random.choice(best_actions)
-    return selected_action, max_q
-
-# ===== エージェント思考ロジック =====
-def decide_lv0_action(own_Q, own_pos, prey1_pos, prey2_pos):
-    act1, val1 = get_action_pure_q(own_Q, *own_pos, *prey1_pos)
-    act2, val2 = get_action_pure_q(own_Q, *own_pos, *prey2_pos)
-    
-    if val1 > val2:
-        target = "prey1"
-        final_action = act1
-    elif val2 > val1:
-        target = "prey2"
-        final_action = act2
-    else:
-        if random.random() < 0.5:
-            target = "prey1"
-            final_action = act1
-        else:
-            target = "prey2"
-            final_action = act2
-    return final_action, target
-
-def decide_lv1_action(own_Q, opp_Q, own_pos, opp_pos, prey1_pos, prey2_pos):
-    _, opp_val1 = get_action_pure_q(opp_Q, *opp_pos, *prey1_pos)
-    _, opp_val2 = get_action_pure_q(opp_Q, *opp_pos, *prey2_pos)
-    
-    if opp_val1 > opp_val2:
-        est_target = "prey1"
-    elif opp_val2 > opp_val1:
-        est_target = "prey2"
-    else:
-        est_target = "prey1" if random.random() < 0.5 else "prey2"
-
-    if est_target == "prey1":
-        my_target = "prey2"
-        final_action, _ = get_action_pure_q(own_Q, *own_pos, *prey2_pos)
-    else:
-        my_target = "prey1"
-        final_action, _ = get_action_pure_q(own_Q, *own_pos, *prey1_pos)
-
-    return final_action, my_target, est_target
+    return rng.sample(all_positions, n)
 
 # ===== グラフ描画関数 (以前のスタイルに復元) =====
 def plot_results(summary_data):
@@ -207,7 +136,8 @@ def plot_results(summary_data):
     filename = "episode_steps_graph.png"
     plt.savefig(filename)
     print(f"グラフを保存しました: {filename}")
-    plt.show()
+    if not HEADLESS:
+        plt.show()
 
 # ===== シミュレーション初期化 =====
 def setup_episode_positions(ep_num):
@@ -216,46 +146,56 @@ def setup_episode_positions(ep_num):
         seed_val = int(REPLAY_SEEDS[idx])
     else:
         seed_val = random.randint(0, 999999)
-    random.seed(seed_val)
-    return sample_non_overlapping_positions(4), seed_val
+    # 初期配置・獲物・各エージェントで別々の乱数系列を使う
+    streams = EpisodeStreams(seed_val)
+    return sample_non_overlapping_positions(4, streams.placement), seed_val, streams
 
 # 初期セットアップ
 MAX_EPISODES = len(REPLAY_SEEDS) if REPLAY_SEEDS else 20
 episode = 1
 steps_in_episode = 0
 
-(positions), current_seed = setup_episode_positions(episode)
+(positions), current_seed, streams = setup_episode_positions(episode)
 (player1_x, player1_y) = positions[0]
 (player2_x, player2_y) = positions[1]
 (prey1_x, prey1_y)     = positions[2]
 (prey2_x, prey2_y)     = positions[3]
 
 hunt1, hunt2 = False, False
-clock = pygame.time.Clock()
 
 print(f"シミュレーション開始: 全{MAX_EPISODES}エピソード")
 
 # ===== メインループ =====
 running = True
 while running:
-    for event in pygame.event.get():
-        if event.type == pygame.QUIT:
-            if episode_summary_log:
-                pd.DataFrame(episode_summary_log).to_csv("episode_summary.csv", index=False)
-                plot_results(episode_summary_log)
-            pygame.quit()
-            sys.exit()
+    if renderer and renderer.quit_requested():
+        if trajectory_writer:
+            trajectory_writer.close()
+        if episode_summary_log:
+            pd.DataFrame(episode_summary_log).to_csv("episode_summary.csv", index=False)
+            plot_results(episode_summary_log)
+        renderer.close()
+        sys.exit()
 
     # --- 行動決定 ---
     action1, target1 = decide_lv0_action(
-        Q1, (player1_x, player1_y), (prey1_x, prey1_y), (prey2_x, prey2_y)
+        policy1, (player1_x, player1_y), (prey1_x, prey1_y), (prey2_x, prey2_y),
+        rng=streams.agent[0]
     )
 
     action2, target2, est_target = decide_lv1_action(
-        Q2, Q1, (player2_x, player2_y), (player1_x, player1_y), (prey1_x, prey1_y), (prey2_x, prey2_y)
+        policy2, policy1, (player2_x, player2_y), (player1_x, player1_y), (prey1_x, prey1_y), (prey2_x, prey2_y),
+        rng=streams.agent[1]
     )
 
     # --- 詳細ログ記録 ---
+    if trajectory_writer:
+        trajectory_writer.append(make_record(
+            episode, steps_in_episode + 1, (player1_x, player1_y), (player2_x, player2_y),
+            (prey1_x, prey1_y), (prey2_x, prey2_y), hunt1, hunt2,
+            action1, action2, target1, target2, est_target
+        ))
+
     if not hunt1 and not hunt2:
         raw_intention_log.append({
             "Episode": episode,
@@ -282,10 +222,12 @@ while running:
     if (player2_x, player2_y) == (prey2_x, prey2_y): hunt2 = True
 
     # --- 獲物移動 ---
+    # 獲物の乱数は止まっているステップでも引き、方策が変わっても同じ時刻に同じ値を使う
+    r1, r2 = streams.prey[0].random(), streams.prey[1].random()
     if not hunt1:
-        prey1_x, prey1_y = move_prey(prey1_x, prey1_y)
+        prey1_x, prey1_y = move_prey(prey1_x, prey1_y, r1)
     if not hunt2:
-        prey2_x, prey2_y = move_prey(prey2_x, prey2_y)
+        prey2_x, prey2_y = move_prey(prey2_x, prey2_y, r2)
 
     steps_in_episode += 1
     
@@ -314,6 +256,10 @@ while running:
         
         # --- 全エピソード終了 ---
         if episode > MAX_EPISODES:
+            if trajectory_writer:
+                trajectory_writer.close()
+                print(f"{TRAJECTORY_FILE} saved. ({trajectory_writer.steps} steps)")
+
             # 1. 生ログ保存
             if raw_intention_log:
                 pd.DataFrame(raw_intention_log).to_csv("raw_intention_log.csv", index=False)
@@ -330,7 +276,7 @@ while running:
             running = False
             continue
         
-        (positions), current_seed = setup_episode_positions(episode)
+        (positions), current_seed, streams = setup_episode_positions(episode)
         (player1_x, player1_y) = positions[0]
         (player2_x, player2_y) = positions[1]
         (prey1_x, prey1_y)     = positions[2]
@@ -339,20 +285,19 @@ while running:
         hunt1, hunt2 = False, False
         steps_in_episode = 0
 
-    screen.fill(WHITE)
-    draw_map()
-    draw_player(player1_img, player1_x, player1_y)
-    draw_player(player2_img, player2_x, player2_y)
-    if not ((player1_x, player1_y) == (prey1_x, prey1_y) or (player2_x, player2_y) == (prey1_x, prey1_y)):
-        draw_prey(prey1_img, prey1_x, prey1_y)
-    if not ((player1_x, player1_y) == (prey2_x, prey2_y) or (player2_x, player2_y) == (prey2_x, prey2_y)):
-        draw_prey(prey2_img, prey2_x, prey2_y)
-
-    status = f"Ep:{episode}/{MAX_EPISODES} Step:{steps_in_episode} Seed:{current_seed}"
-    text = font.render(status, True, (0,0,255))
-    screen.blit(text, (20, 10))
-
-    pygame.display.flip()
-    clock.tick(0)
-
-pygame.quit()
\ No newline at end of file
+    if renderer:
+        hidden = []
+        if (player1_x, player1_y) == (prey1_x, prey1_y) or (player2_x, player2_y) == (prey1_x, prey1_y):
+            hidden.append(0)
+        if (player1_x, player1_y) == (prey2_x, prey2_y) or (player2_x, player2_y) == (prey2_x, prey2_y):
+            hidden.append(1)
+        status = f"Ep:{episode}/{MAX_EPISODES} Step:{steps_in_episode} Seed:{current_seed}"
+        renderer.render(
+            [(player1_x, player1_y), (player2_x, player2_y)],
+            [(prey1_x, prey1_y), (prey2_x, prey2_y)],
+            texts=[(status, (0, 0, 255), (20, 10))],
+            hidden_preys=hidden,
+        )
+
+if renderer:
+    renderer.close()
\ No newline at end of file
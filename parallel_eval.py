@@ -0,0 +1,243 @@
+import argparse
+import os
+import random
+import statistics
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+
+from qtable import QTable
+from greedy_policy import GreedyPolicy, decide_lv0_action, decide_lv1_action
+from rng_streams import EpisodeStreams
+from trajectory_store import TRAJECTORY_DTYPE, TrajectoryWriter, make_record
+
+# =========================================================
+#  プロセスプール版エピソード評価（noplayer_qlearning.py と同じエピソード）
+#  シード列をシャードに分けて複数プロセスで走らせ、結果をエピソード順に結合する。
+#  各エピソードは自分のシードから派生した乱数系列（EpisodeStreams）だけを使うので、
+#  ワーカー数に関係なく結果はビット単位で一致する。
+# =========================================================
+
+GRID_W, GRID_H = 20, 20
+MAX_STEPS = 100
+
+ACTION_TO_DXY = {
+    "UP":    (0, -1),
+    "DOWN":  (0,  1),
+    "LEFT":  (-1, 0),
+    "RIGHT": (1,  0),
+    "STAY":  (0,  0),
+}
+
+# ===== シード値の読み込み =====
+def load_replay_seeds(csv_file):
+    """summary_stats_*.csv（または .parquet）のエピソード表から Seed 列を読み込む。"""
+    if csv_file.endswith(".parquet"):
+        return [int(s) for s in pd.read_parquet(csv_file, columns=["Seed"])["Seed"].tolist()]
+    with open(csv_file, encoding="utf-8_sig") as f:
+        lines = f.readlines()
+    header_idx = next(i for i, line in enumerate(lines) if line.startswith("Episode_ID,"))
+    df = pd.read_csv(csv_file, skiprows=header_idx, encoding="utf-8_sig")
+    return [int(s) for s in df["Seed"].tolist()]
+
+def generate_seeds(n, seed=None):
+    rng = random.Random(seed)
+    return [rng.randint(0, 999999) for _ in range(n)]
+
+# ===== 1エピソード =====
+def calc_torus_manhattan(p1, p2, w, h):
+    dx = abs(p1[0] - p2[0])
+    dy = abs(p1[1] - p2[1])
+    return min(dx, w - dx) + min(dy, h - dy)
+
+def closer_prey(pos, prey1_pos, prey2_pos):
+    d1 = calc_torus_manhattan(pos, prey1_pos, GRID_W, GRID_H)
+    d2 = calc_torus_manhattan(pos, prey2_pos, GRID_W, GRID_H)
+    if d1 < d2: return "prey1"
+    if d2 < d1: return "prey2"
+    return None
+
+def actual_target(pos, hunting, target, prey1_pos, prey2_pos):
+    """実際に向かっている獲物（捕獲中なら押さえている獲物、そうでなければ同点処理後に選んだ獲物）"""
+    if hunting:
+        if pos == prey1_pos: return "prey1"
+        if pos == prey2_pos: return "prey2"
+    return target
+
+def run_episode(seed, policy1, policy2, max_steps=MAX_STEPS, trajectory=None, episode=0):
+    """
+    noplayer_qlearning.py の1エピソード分（player1 = Lv0, player2 = Lv1）。
+    乱数の使い方も noplayer_qlearning.py と同じなので、同じシードなら同じ結果になる。
+    trajectory: リストを渡すと、各ステップを trajectory_store.make_record のタプルで追加する
+    """
+    streams = EpisodeStreams(seed)
+    all_positions = [(x, y) for x in range(GRID_W) for y in range(GRID_H)]
+    p1, p2, prey1, prey2 = streams.placement.sample(all_positions, 4)
+    hunt1, hunt2 = False, False
+
+    def move_prey(x, y, r):
+        if r < 0.2: y -= 1
+        elif r < 0.6: x += 1
+        return x % GRID_W, y % GRID_H
+
+    steps = 0
+    logged = correct = 0
+    lv0_match = lv1_match = lv1_coop = 0
+    while True:
+        action1, target1 = decide_lv0_action(policy1, p1, prey1, prey2, rng=streams.agent[0])
+        action2, target2, est_target = decide_lv1_action(policy2, policy1, p2, p1, prey1, prey2, rng=streams.agent[1])
+        if trajectory is not None:
+            trajectory.append(make_record(episode, steps + 1, p1, p2, prey1, prey2, hunt1, hunt2,
+                                          action1, action2, target1, target2, est_target))
+
+        if not hunt1 and not hunt2:
+            logged += 1
+            correct += target1 == est_target
+
+        # summary_stats.csv 用の集計（近い方を狙ったか / Lv0 が実際に狙った獲物と被らなかったか）
+        # Lv1 は常に推定と逆の獲物を狙うので、推定と比べると毎ステップ ⚪︎ になってしまう。
+        # SimulationLogger と同じく、Lv0 の実際の狙い（同点処理・捕獲後）と比べる
+        lv0_match += target1 == closer_prey(p1, prey1, prey2)
+        lv1_match += target2 == closer_prey(p2, prey1, prey2)
+        lv1_coop += (actual_target(p2, hunt2, target2, prey1, prey2)
+                     != actual_target(p1, hunt1, target1, prey1, prey2))
+
+        if not hunt1:
+            dx, dy = ACTION_TO_DXY[action1]
+            p1 = ((p1[0] + dx) % GRID_W, (p1[1] + dy) % GRID_H)
+        if not hunt2:
+            dx, dy = ACTION_TO_DXY[action2]
+            p2 = ((p2[0] + dx) % GRID_W, (p2[1] + dy) % GRID_H)
+
+        if p1 == prey1 or p1 == prey2: hunt1 = True
+        if p2 == prey1 or p2 == prey2: hunt2 = True
+
+        r1, r2 = streams.prey[0].random(), streams.prey[1].random()
+        if not hunt1:
+            prey1 = move_prey(*prey1, r1)
+        if not hunt2:
+            prey2 = move_prey(*prey2, r2)
+
+        steps += 1
+        if (hunt1 and hunt2) or steps >= max_steps:
+            break
+
+    return {
+        "Steps": steps,
+        "Accuracy": correct / logged * 100 if logged else 0.0,
+        "Seed": seed,
+        "Note": "Clear" if (hunt1 and hunt2) else "TimeUp",
+        "Lv0_Match_Count": lv0_match,
+        "Lv1_Match_Count": lv1_match,
+        "Lv1_Coop_Count": lv1_coop,
+    }
+
+# ===== ワーカープロセス =====
+_worker_policies = None
+
+def _load_policy(path):
+    # 辞書版と最大値・同点の判定を完全に揃えるため float64 で読み込む
+    if path and os.path.exists(path):
+        return GreedyPolicy(QTable.load(path, GRID_W, GRID_H, dtype=np.float64))
+    return GreedyPolicy(QTable(GRID_W, GRID_H, dtype=np.float64))
+
+_worker_record = False
+
+def _init_worker(q1_path, q2_path, record=False):
+    global _worker_policies, _worker_record
+    _worker_policies = (_load_policy(q1_path), _load_policy(q2_path))
+    _worker_record = record
+
+def _run_shard(shard):
+    policy1, policy2 = _worker_policies
+    # 軌跡はシャード単位の構造化配列にして返す（dict のリストより小さく、プロセス間の受け渡しも速い）
+    trajectory = [] if _worker_record else None
+    results = [(ep, run_episode(seed, policy1, policy2, trajectory=trajectory, episode=ep)) for ep, seed in shard]
+    if trajectory is None:
+        return results, None
+    return results, np.array(trajectory, dtype=TRAJECTORY_DTYPE)
+
+def evaluate_seeds(seeds, q1_path, q2_path, workers=None, shard_size=64, trajectory_path=None):
+    """
+    シード列を評価して、エピソード番号順の結果リストを返す。
+    trajectory_path: 指定すると、全ステップをエピソード順に trajectory_store の形式で書き出す
+    """
+    indexed = list(enumerate(seeds, start=1))
+    shards = [indexed[i:i + shard_size] for i in range(0, len(indexed), shard_size)]
+    merged = []
+    writer = TrajectoryWriter(trajectory_path) if trajectory_path else None
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(q1_path, q2_path, writer is not None)) as pool:
+        # pool.map はシャードの順に返すので、軌跡も届いた順に追記すればエピソード順になる
+        for results, trajectory in pool.map(_run_shard, shards):
+            merged.extend(results)
+            if writer:
+                writer.extend(trajectory)
+    if writer:
+        writer.close()
+        print(f"軌跡を保存しました: {trajectory_path} ({writer.steps} ステップ)")
+    merged.sort(key=lambda item: item[0])
+    return [dict(Episode=ep, **result) for ep, result in merged]
+
+# ===== 保存（noplayer_qlearning.py / noplayer_LLM.py と同じ形式） =====
+def save_episode_summary(results, filename="episode_summary.csv"):
+    df = pd.DataFrame(results)[["Episode", "Steps", "Accuracy", "Seed"]]
+    df.to_csv(filename, index=False)
+    print(f"{filename} saved.")
+
+def save_summary_stats(results, filename="summary_stats.csv"):
+    turns = [r["Steps"] for r in results]
+    def avg(key):
+        return round(statistics.mean(r[key] for r in results), 2) if results else 0
+
+    with open(filename, 'w', encoding='utf-8_sig') as f:
+        f.write("【統計サマリー】\n")
+        f.write(f"試行回数,{len(turns)}\n")
+        f.write(f"平均ターン数,{round(statistics.mean(turns), 2) if turns else 0}\n")
+        f.write(f"最大ターン数,{max(turns) if turns else 0}\n")
+        f.write(f"最小ターン数,{min(turns) if turns else 0}\n")
+        f.write(f"Lv0 平均一致回数(近接),{avg('Lv0_Match_Count')}\n")
+        f.write(f"Lv1 平均一致回数(近接),{avg('Lv1_Match_Count')}\n")
+        f.write(f"Lv1 平均協調回数(被り回避),{avg('Lv1_Coop_Count')}\n")
+        f.write("\n")
+
+        f.write("Episode_ID,Seed,End_Turn,Note,Lv0_Match_Count,Lv1_Match_Count,Lv1_Coop_Count\n")
+        for r in results:
+            f.write(f"{r['Episode']},{r['Seed']},{r['Steps']},{r['Note']},{r['Lv0_Match_Count']},{r['Lv1_Match_Count']},{r['Lv1_Coop_Count']}\n")
+    print(f"統計サマリーを保存しました: {filename}")
+
+# =========================================================
+#  コマンドライン実行
+# =========================================================
+def main():
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description="Qテーブル方策のエピソード評価（プロセス並列）")
+    parser.add_argument("--seeds-csv", default=None, help="Seed 列を読む summary_stats_*.csv")
+    parser.add_argument("--episodes", type=int, default=20, help="--seeds-csv がないときに生成するシード数")
+    parser.add_argument("--seed", type=int, default=None, help="シード列を生成するための親シード")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--q1", default=os.path.join(base_dir, "q_table.pkl"), help="Lv0 の Qテーブル")
+    parser.add_argument("--q2", default=os.path.join(base_dir, "q_table.pkl2"), help="Lv1 の Qテーブル")
+    parser.add_argument("--episode-summary", default="episode_summary.csv")
+    parser.add_argument("--summary-stats", default="summary_stats.csv")
+    parser.add_argument("--trajectory", default=None,
+                        help="全ステップをバイナリの軌跡ファイル（trajectory_store 形式）に書き出す")
+    args = parser.parse_args()
+
+    if args.seeds_csv:
+        seeds = load_replay_seeds(args.seeds_csv)
+        print(f"CSVから {len(seeds)} 件のシード値を読み込みました。")
+    else:
+        seeds = generate_seeds(args.episodes, args.seed)
+
+    start = time.perf_counter()
+    results = evaluate_seeds(seeds, args.q1, args.q2, workers=args.workers, trajectory_path=args.trajectory)
+    elapsed = time.perf_counter() - start
+    print(f"{len(results)} エピソード / {elapsed:.2f} 秒")
+
+    save_episode_summary(results, args.episode_summary)
+    save_summary_stats(results, args.summary_stats)
+
+if __name__ == "__main__":
+    main()
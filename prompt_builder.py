@@ -0,0 +1,215 @@
+import hashlib
+import json
+import math
+import os
+import tempfile
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+# =========================================================
+#  LLM プロンプトの組み立て
+#  ルール説明・タスク・出力フォーマットは毎ターン同じ文字列（system）にし、
+#  ターンごとに変わる観測だけをコンパクトな JSON で user メッセージに載せる。
+#  system が毎回バイト単位で同じなので、プロバイダ側のプレフィックスキャッシュが効き、
+#  観測 JSON を system と user に二重に送ることもなくなる。
+#  ルール部分（SYSTEM_PREFIX）は3種類の呼び出しで共通にして、共有できる先頭部分を長くしている。
+# =========================================================
+
+SYSTEM_PREFIX = """
+これ以降、あなた自身（のハンター）を「自己」、協力相手であるもう一体のハンターを「他者」と呼びます。
+私が指示した以外の返答は一切不要です。
+
+# ■ ハンタータスクの説明
+- マップ：幅20×高さ20のグリッド。トーラス構造のため、端から出ると反対側に回り込みます。
+- エンティティ：2体のハンター（自己・他者）と2体の獲物（A・B）が存在します。
+    -獲物の動きはランダムに動くものであり、ハンターを避けるなどの意思はない。
+    -20%の確率で上、40%の確率で右、40%の確率でその場に留まる。
+- ターン制：各ターンで全エージェント（ハンターと獲物）が**同時に**1行動を実行します。
+- **捕獲条件**：ターンの行動更新**後**に、ハンター一体と獲物一体の**座標が一致**したとき、その獲物は捕獲状態であるとみなされます。
+    - ハンターがその座標から移動すると、即座に「未捕獲状態」に戻る。
+    - 2体の獲物が同ターンに別々に捕獲されることもあります。
+- ハンター同士の位置衝突：同一セルへの同時進入や停止は**許可**（ブロッキングなし）。
+- エピソード終了条件：① 両方の獲物が捕獲された、または ② 最大ターン数 T に到達した場合。
+- 観測：各ターンで、自己・他者・獲物A・獲物Bの**現在座標**と獲物A・獲物Bが捕まっているかという情報が観測可能です。
+- 目的：
+    - ハンターは効率的に全ての獲物を捕獲することを目指します。
+    - ターンの終了時に、**「獲物A」と「獲物B」が両方とも「捕獲中」**であればクリア。
+        - 片方だけが捕獲状態であっても、ゲームは終わらない。
+
+# ■ 入力
+ユーザーメッセージとして、毎ターンの観測JSON（座標 [x, y] と捕獲フラグ）が与えられます。
+""".strip()
+
+_ACTION_FORMAT = """
+# ■ 出力フォーマット（厳守）
+以下のJSONのみを出力してください（追加テキスト禁止）。
+「狙っている獲物」には、現在ターゲットにしている獲物（"獲物A" または "獲物B"）を明記してください：
+{
+"狙っている獲物": "獲物A" / "獲物B",
+"次の行動": "上 / 下 / 左 / 右 / その場に留まる",
+"理由": "なぜその獲物を狙ったのという理由を具体的に説明"
+}
+""".strip()
+
+TASKS = {
+    "estimate": """
+# ■ あなたの役割
+あなたは意図推定システムです。
+
+# ■ タスク
+観測JSON（座標と捕獲フラグ）から、
+「他者の意図（他者がどの獲物を狙っているか）」を1つ推定し、**その推定に至った理由も簡潔に出力**してください。
+
+# ■ 出力フォーマット（厳守）
+以下のJSONのみを出力してください（追加テキスト禁止）：
+{
+"他者の意図": "（獲物Aを狙っている / 獲物Bを狙っている / 獲物A捕獲中のためその場に留まる / 獲物B捕獲中のためその場に留まる / 不明）",
+"次の行動": "上 / 下 / 左 / 右 / その場に留まる",
+"理由": "簡潔に説明",
+"推定理由": "他者や獲物の位置に基づいて、推定に至った具体的な理由"
+}
+""".strip(),
+    "cooperative": """
+# ■ あなたの役割
+あなたは行動決定システムです。
+
+# ■ タスク
+観測JSON（"観測"：座標と捕獲フラグ）と他者の意図（"他者の推定意図"）に基づき、
+次ターンの**自己の行動**を （上, 下, 左, 右, その場に留まる）のいずれか1つで決定し、簡潔な理由とともに出力してください。
+
+""".strip() + "\n\n" + _ACTION_FORMAT,
+    "solo": """
+# ■ あなたの役割
+あなたは行動決定システムです。
+
+# ■ タスク
+観測JSON（座標と捕獲フラグ）のみに基づき、
+次ターンの**自己の行動**を （上, 下, 左, 右, その場に留まる）のいずれか1つで決定し、簡潔な理由とともに出力してください。
+""".strip() + "\n\n" + _ACTION_FORMAT,
+    # Lv1 の1回呼び出しモード: 意図推定と協調行動の決定を1つの応答で行う
+    "fused": """
+# ■ あなたの役割
+あなたは意図推定と行動決定を同時に行うシステムです。
+
+# ■ タスク
+観測JSON（座標と捕獲フラグ）から、まず「他者の意図（他者がどの獲物を狙っているか）」を1つ推定してください。
+次に、その推定に基づいて、次ターンの**自己の行動**を （上, 下, 左, 右, その場に留まる）のいずれか1つで決定し、簡潔な理由とともに出力してください。
+
+# ■ 出力フォーマット（厳守）
+以下のJSONのみを出力してください（追加テキスト禁止）。
+「狙っている獲物」には、現在ターゲットにしている獲物（"獲物A" または "獲物B"）を明記してください：
+{
+"他者の意図": "（獲物Aを狙っている / 獲物Bを狙っている / 獲物A捕獲中のためその場に留まる / 獲物B捕獲中のためその場に留まる / 不明）",
+"推定理由": "他者や獲物の位置に基づいて、推定に至った具体的な理由",
+"狙っている獲物": "獲物A" / "獲物B",
+"次の行動": "上 / 下 / 左 / 右 / その場に留まる",
+"理由": "なぜその獲物を狙ったのという理由を具体的に説明"
+}
+""".strip(),
+}
+
+# 種類ごとの system プロンプト（実行中は変わらない）
+SYSTEM_PROMPTS = {kind: SYSTEM_PREFIX + "\n\n" + task for kind, task in TASKS.items()}
+
+def system_prompt(kind):
+    return SYSTEM_PROMPTS[kind]
+
+def _compact(obj):
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+
+def user_payload(state_info, opponent_intention=None):
+    """ターンごとの観測（協調行動では推定した他者の意図も）をコンパクトな JSON にする。"""
+    if opponent_intention is None:
+        return _compact(state_info)
+    # 推定結果のうち、行動決定に使うのは意図とその理由だけ
+    return _compact({
+        "観測": state_info,
+        "他者の推定意図": {
+            "他者の意図": opponent_intention.get("他者の意図", "不明"),
+            "推定理由": opponent_intention.get("推定理由", ""),
+        },
+    })
+
+# =========================================================
+#  トークン数の計測
+#  API の応答に usage があればそれを使い、ない場合（オフラインの代役など）は
+#  tiktoken（入っていなければ文字数からの概算）で見積もる。
+#  tiktoken は語彙ファイルが手元にないと初回にダウンロードしようとする（オフラインだと
+#  タイムアウトまで止まる）ので、キャッシュ済みのときだけ使う。
+# =========================================================
+ENCODING_NAME = "o200k_base"
+ENCODING_URL = "https://openaipublic.blob.core.windows.net/encodings/o200k_base.tiktoken"
+_encoding = None
+
+def _encoding_cached():
+    """tiktoken と同じ規則でキャッシュの置き場所を探し、語彙ファイルがあるかを返す。"""
+    if "TIKTOKEN_CACHE_DIR" in os.environ:
+        cache_dir = os.environ["TIKTOKEN_CACHE_DIR"]
+    elif "DATA_GYM_CACHE_DIR" in os.environ:
+        cache_dir = os.environ["DATA_GYM_CACHE_DIR"]
+    else:
+        cache_dir = os.path.join(tempfile.gettempdir(), "data-gym-cache")
+    if not cache_dir:
+        return False
+    return os.path.exists(os.path.join(cache_dir, hashlib.sha1(ENCODING_URL.encode()).hexdigest()))
+
+def _get_encoding():
+    global _encoding, tiktoken
+    if _encoding is None and tiktoken is not None:
+        if not _encoding_cached():
+            tiktoken = None
+            return None
+        try:
+            _encoding = tiktoken.get_encoding(ENCODING_NAME)
+        except Exception:
+            # キャッシュが壊れているなどで読めないときは概算に切り替える
+            tiktoken = None
+    return _encoding
+
+def token_estimator():
+    """usage がない呼び出しのトークン数をどう数えているか（表示用）"""
+    if _get_encoding() is not None:
+        return f"tiktoken ({ENCODING_NAME})"
+    return "文字数からの概算（1.5 文字 ≒ 1 トークン）"
+
+def count_tokens(text):
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text))
+    # 日本語が多いので 1.5 文字 ≒ 1 トークンで概算する
+    return math.ceil(len(text) / 1.5)
+
+def estimate_usage(system_prompt, user_prompt, completion):
+    return {
+        "prompt_tokens": count_tokens(system_prompt) + count_tokens(user_prompt),
+        "completion_tokens": count_tokens(completion),
+        "cached_tokens": 0,
+    }
+
+class TokenStats:
+    """呼び出しの種類ごとのプロンプトトークン数・キャッシュ済みトークン数・応答時間の集計"""
+    def __init__(self):
+        self.by_kind = {}
+
+    def record(self, kind, usage, elapsed):
+        s = self.by_kind.setdefault(kind or "other", {
+            "calls": 0, "prompt_tokens": 0, "cached_tokens": 0, "completion_tokens": 0, "seconds": 0.0,
+        })
+        s["calls"] += 1
+        s["prompt_tokens"] += usage.get("prompt_tokens", 0)
+        s["cached_tokens"] += usage.get("cached_tokens", 0)
+        s["completion_tokens"] += usage.get("completion_tokens", 0)
+        s["seconds"] += elapsed
+
+    def summary(self):
+        lines = [f"トークン数の見積もり（usage がない呼び出し）: {token_estimator()}",
+                 "種類, 呼び出し数, 平均プロンプトトークン, キャッシュ済み割合, 平均応答トークン, 平均応答時間(秒)"]
+        for kind, s in self.by_kind.items():
+            n = s["calls"]
+            cached = s["cached_tokens"] / s["prompt_tokens"] * 100 if s["prompt_tokens"] else 0.0
+            lines.append(f"{kind}, {n}, {s['prompt_tokens'] / n:.0f}, {cached:.1f}%, "
+                         f"{s['completion_tokens'] / n:.0f}, {s['seconds'] / n:.3f}")
+        return "\n".join(lines)
@@ -0,0 +1,95 @@
+import pickle
+import numpy as np
+
+# =========================================================
+#  配列版 Qテーブル
+#  相対状態 (dx, dy) × 行動 の Q値を連続した float32 配列で持つ。
+#  pickle の辞書形式 Q[(dx, dy)][action] と相互変換できるので、
+#  既存の q_table.pkl / q_table.pkl2 もそのまま読み書きできる。
+# =========================================================
+
+ACTIONS = ["UP", "DOWN", "LEFT", "RIGHT", "STAY"]
+
+def random_argmax(q_rows, rng):
+    """
+    (N, A) の Q値から最大値の行動を選ぶ（同点はランダム）。
+    戻り値: (行動インデックス配列, 最大Q値配列)
+    """
+    max_q = q_rows.max(axis=1)
+    is_best = q_rows == max_q[:, None]
+    # 最大値の行動にだけ一様乱数を振り、その argmax を取ると同点内で一様に選ばれる
+    keys = rng.random(q_rows.shape) * is_best
+    return keys.argmax(axis=1), max_q
+
+class QTable:
+    def __init__(self, grid_w=20, grid_h=20, actions=ACTIONS, dtype=np.float32):
+        self.grid_w = grid_w
+        self.grid_h = grid_h
+        self.actions = list(actions)
+        self.half_w = grid_w // 2
+        self.half_h = grid_h // 2
+        # get_relative_state は ±w/2 をそのまま返すので、各軸 2*(w//2)+1 通り
+        self.values = np.zeros(
+            (2 * self.half_w + 1, 2 * self.half_h + 1, len(self.actions)), dtype=dtype
+        )
+
+    # ===== インデックス変換 =====
+    def index(self, dx, dy):
+        """相対座標 (dx, dy) を配列インデックスに変換する（配列でも可）。"""
+        return dx + self.half_w, dy + self.half_h
+
+    def rows(self, dx, dy):
+        """相対座標の Q値の行を返す。スカラーなら (A,)、配列なら (N, A)。"""
+        ix, iy = self.index(dx, dy)
+        return self.values[ix, iy]
+
+    def __getitem__(self, state):
+        return self.rows(*state)
+
+    def max_q(self, dx, dy):
+        return self.rows(dx, dy).max(axis=-1)
+
+    def greedy(self, dx, dy, rng):
+        """相対座標の配列に対して最大Q値の行動を返す（同点はランダム）。"""
+        return random_argmax(self.rows(np.atleast_1d(dx), np.atleast_1d(dy)), rng)
+
+    # ===== 辞書形式との相互変換 =====
+    @classmethod
+    def from_dict(cls, q_table, grid_w=20, grid_h=20, actions=ACTIONS, dtype=np.float32, source="Q辞書"):
+        """
+        pickle の Q辞書から作る。未登録の状態は get_action_pure_q と同じく全行動 0.0。
+        source: エラーメッセージに出す読み込み元（ファイル名など）
+        """
+        table = cls(grid_w, grid_h, actions, dtype)
+        for state in q_table:
+            if not (isinstance(state, tuple) and len(state) == 2):
+                # agent_qlearning.py は絶対座標 (hx, hy, px, py) をキーにした Q辞書を保存する
+                raise ValueError(
+                    f"{source} は相対状態 (dx, dy) をキーにした Qテーブルではありません"
+                    f"（キーの例: {state!r}）。QTable が読めるのは Q[(dx, dy)][action] 形式の"
+                    f"相対状態の Qテーブルです（agent_qlearning2.py / train_qlearning_batch.py で学習したもの）。"
+                )
+        for (dx, dy), q_vals in q_table.items():
+            if abs(dx) > table.half_w or abs(dy) > table.half_h:
+                raise ValueError(f"相対状態がマップ範囲外です: {(dx, dy)}")
+            table.values[table.index(dx, dy)] = [q_vals.get(a, 0.0) for a in table.actions]
+        return table
+
+    def to_dict(self):
+        """全ての相対状態を pickle 互換の辞書 Q[(dx, dy)][action] で返す。"""
+        return {
+            (ix - self.half_w, iy - self.half_h): {
+                a: float(self.values[ix, iy, k]) for k, a in enumerate(self.actions)
+            }
+            for ix in range(self.values.shape[0])
+            for iy in range(self.values.shape[1])
+        }
+
+    @classmethod
+    def load(cls, path, grid_w=20, grid_h=20, dtype=np.float32):
+        with open(path, "rb") as f:
+            return cls.from_dict(pickle.load(f), grid_w, grid_h, dtype=dtype, source=path)
+
+    def save(self, path):
+        with open(path, "wb") as f:
+            pickle.dump(self.to_dict(), f)
@@ -0,0 +1,106 @@
+import json
+import sqlite3
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# =========================================================
+#  LLM の理由文の別保存（zstd 圧縮・SQLite）
+#  詳細ログの大半は日本語の理由文（Lv1_推定理由・Lv1_行動理由・Lv0_行動理由）で、
+#  数値だけの分析でも毎回それを読み込むことになる。理由文は詳細ログから外してここに入れ、
+#  (エピソード, ターン, エージェント) をキーに、必要になったときだけ読み出す。
+#  1エピソード分をまとめて zstd で圧縮して1行に保存する（短い文を1つずつ圧縮するより縮む）。
+# =========================================================
+
+DEFAULT_REASONING_PATH = "reasoning_store.sqlite3"
+
+# 詳細ログの列名 → (エージェント, 項目名)
+REASON_COLUMNS = {
+    "Lv1_推定理由": ("Lv1", "推定理由"),
+    "Lv1_行動理由": ("Lv1", "行動理由"),
+    "Lv0_行動理由": ("Lv0", "行動理由"),
+}
+
+def split_reasons(record):
+    """
+    ターンの記録から理由文の列を取り除き、[(ターン, エージェント, {項目名: 理由文}), ...] を返す。
+    """
+    by_agent = {}
+    for column, (agent, field) in REASON_COLUMNS.items():
+        if column in record:
+            by_agent.setdefault(agent, {})[field] = record.pop(column)
+    return [(record["現在のターン"], agent, fields) for agent, fields in by_agent.items()]
+
+class ReasoningStore:
+    def __init__(self, path=DEFAULT_REASONING_PATH, truncate=False, level=10):
+        """truncate: True なら既存の内容を消して新しい実行の保存先にする"""
+        if zstandard is None:
+            raise ImportError("理由文の圧縮保存には zstandard が必要です（pip install zstandard）")
+        self.path = path
+        self.raw_bytes = 0
+        self.stored_bytes = 0
+        self._compressor = zstandard.ZstdCompressor(level=level)
+        self._decompressor = zstandard.ZstdDecompressor()
+        self._last = None  # 直前に展開したエピソード（同じエピソードを続けて引くときのため）
+
+        self.conn = sqlite3.connect(path, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        if truncate:
+            self.conn.execute("DROP TABLE IF EXISTS reasons")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS reasons (episode INTEGER PRIMARY KEY, data BLOB NOT NULL)"
+        )
+
+    def put_episode(self, episode_id, rows):
+        """rows: split_reasons が返す (ターン, エージェント, {項目名: 理由文}) のリスト"""
+        raw = json.dumps(rows, ensure_ascii=False).encode("utf-8")
+        data = self._compressor.compress(raw)
+        self.conn.execute("INSERT OR REPLACE INTO reasons (episode, data) VALUES (?, ?)", (episode_id, data))
+        self.raw_bytes += len(raw)
+        self.stored_bytes += len(data)
+        self._last = None
+
+    def _load(self, episode_id):
+        if self._last is None or self._last[0] != episode_id:
+            row = self.conn.execute("SELECT data FROM reasons WHERE episode = ?", (episode_id,)).fetchone()
+            rows = json.loads(self._decompressor.decompress(row[0])) if row else []
+            self._last = (episode_id, rows)
+        return self._last[1]
+
+    def get(self, episode_id, turn=None, agent=None):
+        """
+        指定したエピソードの理由文を [(ターン, エージェント, {項目名: 理由文}), ...] で返す。
+        turn / agent を指定するとそれだけに絞る。
+        """
+        return [
+            (t, a, fields) for t, a, fields in self._load(episode_id)
+            if (turn is None or t == turn) and (agent is None or a == agent)
+        ]
+
+    def episodes(self):
+        return [row[0] for row in self.conn.execute("SELECT episode FROM reasons ORDER BY episode")]
+
+    def to_frame(self, episode_ids=None):
+        """
+        詳細ログと同じ列名（Episode_ID, 現在のターン, Lv1_推定理由, ...）の DataFrame にする。
+        詳細ログに Episode_ID と 現在のターン で結合すれば元の形に戻る。
+        """
+        import pandas as pd
+        rows = {}
+        for episode_id in (self.episodes() if episode_ids is None else episode_ids):
+            for turn, agent, fields in self._load(episode_id):
+                row = rows.setdefault((episode_id, turn), {"Episode_ID": episode_id, "現在のターン": turn})
+                for field, text in fields.items():
+                    row[f"{agent}_{field}"] = text
+        return pd.DataFrame(list(rows.values()))
+
+    def summary(self):
+        ratio = self.stored_bytes / self.raw_bytes * 100 if self.raw_bytes else 0.0
+        return (f"理由文: {self.raw_bytes / 1024:.0f} KB → {self.stored_bytes / 1024:.0f} KB "
+                f"({ratio:.1f}%) を {self.path} に保存")
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,66 @@
+import os
+import pygame
+
+# =========================================================
+#  pygame 描画オブザーバ
+#  シミュレーション本体からは状態を渡して render() を呼ぶだけにし、
+#  --headless のときはこのモジュール自体を読み込まない。
+# =========================================================
+WHITE = (255, 255, 255)
+
+class HunterRenderer:
+    def __init__(self, caption, grid_w=20, grid_h=20, tile_size=32,
+                 screen_size=(900, 640), fps=0):
+        pygame.init()
+        self.grid_w = grid_w
+        self.grid_h = grid_h
+        self.tile_size = tile_size
+        self.fps = fps
+        self.screen = pygame.display.set_mode(screen_size)
+        pygame.display.set_caption(caption)
+
+        self.ground_img = self._load_scaled("images/ground.png", (200, 200, 200))
+        self.player_imgs = [self._load_scaled("images/player1.png", (255, 0, 0)),
+                            self._load_scaled("images/player2.png", (255, 0, 0))]
+        self.prey_imgs = [self._load_scaled("images/prey1.png", (255, 0, 0)),
+                          self._load_scaled("images/prey2.png", (255, 0, 0))]
+        self.font = pygame.font.SysFont(None, 24)
+        self.clock = pygame.time.Clock()
+
+    def _load_scaled(self, path, fallback_color):
+        if not os.path.exists(path):
+            surf = pygame.Surface((self.tile_size, self.tile_size))
+            surf.fill(fallback_color)
+            return surf
+        img = pygame.image.load(path)
+        return pygame.transform.scale(img, (self.tile_size, self.tile_size))
+
+    def quit_requested(self):
+        """ウィンドウの閉じるボタンが押されたら True を返す。"""
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                return True
+        return False
+
+    def render(self, players, preys, texts=(), hidden_preys=(), fps=None):
+        """
+        players / preys: [(x, y), ...]（1体だけのタスクでも可）
+        texts: [(文字列, 色, (x, y)), ...]
+        hidden_preys: 描画しない獲物のインデックス
+        """
+        self.screen.fill(WHITE)
+        for row in range(self.grid_h):
+            for col in range(self.grid_w):
+                self.screen.blit(self.ground_img, (col * self.tile_size, row * self.tile_size))
+        for img, (x, y) in zip(self.player_imgs, players):
+            self.screen.blit(img, (x * self.tile_size, y * self.tile_size))
+        for i, (img, (x, y)) in enumerate(zip(self.prey_imgs, preys)):
+            if i not in hidden_preys:
+                self.screen.blit(img, (x * self.tile_size, y * self.tile_size))
+        for text, color, pos in texts:
+            self.screen.blit(self.font.render(text, True, color), pos)
+        pygame.display.flip()
+        self.clock.tick(self.fps if fps is None else fps)
+
+    def close(self):
+        pygame.quit()
@@ -0,0 +1,27 @@
+import hashlib
+import random
+
+# =========================================================
+#  エピソードごと・エンティティごとの乱数系列
+#  グローバルの random.seed を使うと、獲物の移動・Q値の同点処理・Lv1 のコイン投げが
+#  1本の系列を取り合うため、方策を変えると獲物の軌跡まで変わってしまう。
+#  ここではシードから独立した系列を派生させ、
+#  異なる方策でも同じ獲物の軌跡（共通乱数）で比較できるようにする。
+# =========================================================
+
+def derive_seed(seed, name):
+    """親シードと系列名から 64bit のシードを作る（プロセスや実行環境に依存しない）。"""
+    digest = hashlib.sha256(f"{seed}:{name}".encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big")
+
+class EpisodeStreams:
+    """
+    placement: 初期配置用。random.seed(seed) と同じ系列なので、従来と同じ初期配置になる
+    prey[i]:   獲物 i の移動用
+    agent[i]:  ハンター i の同点処理・コイン投げ用
+    """
+    def __init__(self, seed, n_preys=2, n_agents=2):
+        self.seed = seed
+        self.placement = random.Random(seed)
+        self.prey = [random.Random(derive_seed(seed, f"prey{i + 1}")) for i in range(n_preys)]
+        self.agent = [random.Random(derive_seed(seed, f"agent{i + 1}")) for i in range(n_agents)]
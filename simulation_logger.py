@@ -0,0 +1,521 @@
+import asyncio
+import atexit
+import csv
+import json
+import os
+import queue
+import random
+import statistics
+import threading
+import time
+import numpy as np
+import pandas as pd
+import matplotlib.pyplot as plt
+from matplotlib.ticker import MultipleLocator
+
+from reasoning_store import REASON_COLUMNS, ReasoningStore, split_reasons
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+def percentile(values, q):
+    return round(float(np.percentile(values, q)), 3) if values else 0
+
+# 推測実行で使わなかった呼び出し（時間の集計からは外し、呼び出し数・トークン数には含める）
+SPECULATIVE_STATUSES = ("discarded", "cancelled")
+
+# 詳細ログ（detailed_log.csv）の列
+DETAIL_COLUMNS = [
+    "Episode_ID", "Seed", "現在のターン",
+    "Lv0_狙い(宣言)", "Lv0_近い方を狙ったか", 
+    "Lv1_狙い(宣言)", "Lv1_近い方を狙ったか", "Lv1_協調判定(被り回避)", # ★追加
+    "Lv1_意図推定", "Lv1_意図推定の正誤", "Lv1_モード", "Lv1_推定理由", "Lv1_決定行動", "Lv1_行動理由",
+    "Lv0_決定行動", "Lv0_行動理由",
+    "Lv1_X", "Lv1_Y", "Lv0_X", "Lv0_Y", "PreyA_X", "PreyA_Y", "PreyB_X", "PreyB_Y",
+    "Lv0-A(Manhattan)", "Lv0-A(Torus)", 
+    "Lv0-B(Manhattan)", "Lv0-B(Torus)",
+    "Lv1-A(Manhattan)", "Lv1-A(Torus)", 
+    "Lv1-B(Manhattan)", "Lv1-B(Torus)",
+    "LLM_呼び出し数", "LLM_キャッシュ", "LLM_ターン時間(秒)", "LLM_最大呼び出し時間(秒)",
+    "LLM_プロンプトトークン", "LLM_応答トークン", "LLM_再試行回数", "LLM_エラー数", "LLM_推測破棄数", "LLM_フォールバック", "LLM_モデル"
+]
+
+# =========================================================
+#  列指向（Parquet）で保存するときの型
+#  ファイル名が .parquet のときに使う。座標・距離は int8、判定の印・行動・狙い・理由文などの
+#  文字列は辞書エンコード（読み込むと pandas の category 型）にして、CSV より小さく速く読めるようにする。
+# =========================================================
+DETAIL_DTYPES = {col: "category" for col in DETAIL_COLUMNS}
+DETAIL_DTYPES.update({
+    "Episode_ID": "int32", "Seed": "int32", "現在のターン": "int16",
+    **{col: "int8" for col in DETAIL_COLUMNS if col.endswith(("_X", "_Y", "(Manhattan)", "(Torus)"))},
+    "LLM_呼び出し数": "int16", "LLM_キャッシュ": "int16", "LLM_再試行回数": "int16",
+    "LLM_エラー数": "int16", "LLM_推測破棄数": "int16",
+    "LLM_プロンプトトークン": "int32", "LLM_応答トークン": "int32",
+    "LLM_ターン時間(秒)": "float32", "LLM_最大呼び出し時間(秒)": "float32",
+})
+
+# summary_stats のエピソード表の列と型
+EPISODE_DTYPES = {
+    "Episode_ID": "int32", "Seed": "int32", "End_Turn": "int16", "Note": "category",
+    "Lv0_Match_Count": "int16", "Lv1_Match_Count": "int16", "Lv1_Coop_Count": "int16",
+    "Lv1_Intent_Correct_Count": "int16", "Lv1_Mode": "category",
+    "Call_Latency_p50": "float32", "Call_Latency_p95": "float32",
+    "Turn_Time_p50": "float32", "Turn_Time_p95": "float32", "Tokens_per_Turn": "float32",
+    "Retries": "int32", "LLM_Errors": "int32", "Fallback_Turns": "int16", "Speculative_Discarded": "int32",
+}
+
+def require_pyarrow():
+    # pq.write_table などの属性を引く前に呼ぶ（pyarrow がないと NoneType のエラーになるため）
+    if pa is None:
+        raise ImportError("Parquet で保存するには pyarrow が必要です（pip install pyarrow）")
+
+def arrow_schema(dtypes):
+    require_pyarrow()
+    types = {"category": pa.dictionary(pa.int32(), pa.string())}
+    return pa.schema([(col, types.get(dtype) or pa.type_for_alias(dtype)) for col, dtype in dtypes.items()])
+
+def records_to_table(records, dtypes=DETAIL_DTYPES):
+    """ログの dict のリストを、dtypes の型の pyarrow.Table にする（空文字の数値は欠損値）。"""
+    numeric = [col for col, dtype in dtypes.items() if dtype != "category"]
+    rows = [{**r, **{col: None for col in numeric if r.get(col) == ""}} for r in records]
+    return pa.Table.from_pylist(rows, schema=arrow_schema(dtypes))
+
+# =========================================================
+#  詳細ログの逐次書き出し
+#  終わったエピソードのターン記録をキューで受け取り、バックグラウンドのスレッドが
+#  flush_episodes エピソード分たまるか flush_interval 秒たつごとに CSV へ追記する。
+#  ヘッダーは開いた時点で書き、追記は行単位なので、途中で止まっても
+#  それまでのエピソードは読めるログとして残る。書き出し待ちは max_queued エピソードまでで、
+#  書き込みが追いつかないときは呼び出し側が空きを待つので、メモリは増え続けない。
+#  asyncio のエピソードからは put_async を使う（空きを待つ間もイベントループは止めず、
+#  そのエピソードだけが待つ）。
+#  Parquet はフッターを閉じるときに書くため、途中で止まると読めないファイルになる。
+#  逐次書き出しは CSV だけにし、Parquet の詳細ログは最後にまとめて保存する（save_all_logs）。
+# =========================================================
+class StreamingLogWriter:
+    def __init__(self, path, columns=DETAIL_COLUMNS, flush_episodes=4, flush_interval=2.0, max_queued=64):
+        if path.endswith(".parquet"):
+            raise ValueError(f"{path}: 詳細ログの逐次書き出しは CSV のみです（Parquet は最後にまとめて保存してください）")
+        self.path = path
+        self.flush_episodes = flush_episodes
+        self.flush_interval = flush_interval
+        self.episodes = 0
+        self.rows = 0
+        # 書き出し待ちのエピソード数の上限（書き込みスレッドが書き終えたら空きを返す）
+        self._slots = threading.BoundedSemaphore(max_queued)
+        self._queue = queue.Queue()
+        self._error = None
+        self._closed = False
+
+        self._file = open(path, "w", encoding="utf-8_sig", newline="")
+        self._writer = csv.DictWriter(self._file, fieldnames=columns, extrasaction="ignore")
+        self._writer.writeheader()
+        self._file.flush()
+
+        self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+        self._thread.start()
+        # 例外や Ctrl+C で終わった場合も、受け取り済みの分は書き切る
+        atexit.register(self.close)
+
+    def put(self, records):
+        """1エピソード分のターン記録を書き出し待ちに入れる（空きがなければ待つ）。"""
+        if self._error is not None:
+            raise self._error
+        self._slots.acquire()
+        self._queue.put_nowait(records)
+
+    async def put_async(self, records):
+        """put と同じだが、空きを待つ間もイベントループを止めない。"""
+        if self._error is not None:
+            raise self._error
+        if not self._slots.acquire(blocking=False):
+            waiter = asyncio.get_running_loop().run_in_executor(None, self._slots.acquire)
+            try:
+                await asyncio.shield(waiter)
+            except asyncio.CancelledError:
+                # 取り消されても待ちのスレッドはいずれ空きを取るので、取ったら返す
+                waiter.add_done_callback(lambda _: self._slots.release())
+                raise
+        self._queue.put_nowait(records)
+
+    def _run(self):
+        pending = []
+        deadline = None
+        while True:
+            # 書き出し待ちがあるときは、最初の1件から flush_interval 秒までしか待たない
+            timeout = max(0.0, deadline - time.monotonic()) if pending else None
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = []
+            if item:
+                if not pending:
+                    deadline = time.monotonic() + self.flush_interval
+                pending.append(item)
+            if pending and (item is None or len(pending) >= self.flush_episodes or time.monotonic() >= deadline):
+                try:
+                    self._write(pending)
+                except Exception as e:
+                    self._error = e
+                finally:
+                    for _ in pending:
+                        self._slots.release()
+                pending = []
+            if item is None:
+                return
+
+    def _write(self, episodes):
+        records = [r for episode in episodes for r in episode]
+        self._writer.writerows(records)
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self.rows += len(records)
+        self.episodes += len(episodes)
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join()
+        self._file.close()
+        if self._error is not None:
+            raise self._error
+
+# =========================================================
+#  エピソード単位の集計
+#  add_turn_log のたびに1ターン分を足し込んでおき、エピソード終了時は
+#  それを読み出すだけにする（turn_logs 全体を探し直さない）。
+# =========================================================
+class EpisodeCounter:
+    def __init__(self):
+        self.turns = 0
+        self.lv0_match = 0
+        self.lv1_match = 0
+        self.lv1_coop = 0
+        self.lv1_intent = 0
+        self.modes = set()
+        self.call_seconds = []
+        self.turn_seconds = []
+        self.tokens = 0
+        self.retries = 0
+        self.errors = 0
+        self.fallback_turns = 0
+        self.speculative_discarded = 0
+        self.api_calls = 0
+
+    def add(self, record):
+        self.turns += 1
+        self.lv0_match += record["Lv0_近い方を狙ったか"] == "⚪︎"
+        self.lv1_match += record["Lv1_近い方を狙ったか"] == "⚪︎"
+        self.lv1_coop += record["Lv1_協調判定(被り回避)"] == "⚪︎"
+        self.lv1_intent += record["Lv1_意図推定の正誤"] == "⚪︎"
+        if record["Lv1_モード"]:
+            self.modes.add(record["Lv1_モード"])
+        self.call_seconds.extend(record["_llm_call_seconds"])
+        if record["LLM_ターン時間(秒)"] != "":
+            self.turn_seconds.append(record["LLM_ターン時間(秒)"])
+        self.tokens += record["LLM_プロンプトトークン"] + record["LLM_応答トークン"]
+        self.retries += record["LLM_再試行回数"]
+        self.errors += record["LLM_エラー数"]
+        self.fallback_turns += bool(record["LLM_フォールバック"])
+        self.speculative_discarded += record["LLM_推測破棄数"]
+        self.api_calls += record["LLM_呼び出し数"]
+
+# =========================================================
+#  実行全体の分位点
+#  全ターンの時間をリストで持ち続けると実行の長さに比例してメモリが増えるので、
+#  固定サイズの無作為標本（リザーバサンプリング）から p50 / p95 を求める。
+#  値が size 個以下のうちは全部を持つので、短い実行では正確な値になる。
+# =========================================================
+class LatencyReservoir:
+    def __init__(self, size=4096, seed=0):
+        self.size = size
+        self.count = 0
+        self.samples = []
+        self._rng = random.Random(seed)
+
+    def extend(self, values):
+        for value in values:
+            self.count += 1
+            if len(self.samples) < self.size:
+                self.samples.append(value)
+            else:
+                # これまでの count 個から一様に size 個を残す
+                j = self._rng.randrange(self.count)
+                if j < self.size:
+                    self.samples[j] = value
+
+    def percentile(self, q):
+        return percentile(self.samples, q)
+
+# =========================================================
+#  ログ収集・分析用クラス
+# =========================================================
+class SimulationLogger:
+    def __init__(self, map_width=20, map_height=20, stream_path=None, flush_episodes=4, flush_interval=2.0,
+                 reasoning_path=None):
+        """
+        stream_path: 指定すると、詳細ログを終わったエピソードから順にこのファイルへ追記する
+        （turn_logs には全ターンを溜めず、進行中のエピソードの分だけを持つ）。
+        reasoning_path: 指定すると、理由文の列を詳細ログから外し、このファイル（ReasoningStore）に圧縮して保存する
+        """
+        self.turn_logs = []
+        self.episode_results = []
+        self.turn_count = 0
+        # 終わったエピソードの分を足し込んでいく実行全体の集計（ターンごとの値は持ち続けない）
+        self.call_seconds = LatencyReservoir()
+        self.turn_seconds = LatencyReservoir()
+        self.api_calls = 0
+        # 進行中のエピソードの集計（Episode_ID ごと。並行実行でも混ざらない）
+        self.episode_counters = {}
+        # 逐次書き出し時の、進行中のエピソードのターン記録
+        self.episode_turns = {}
+        # 理由文の別保存（進行中のエピソードの分はエピソード終了時にまとめて書く）
+        self.reasoning = ReasoningStore(reasoning_path, truncate=True) if reasoning_path else None
+        self.episode_reasons = {}
+        self.detail_columns = [c for c in DETAIL_COLUMNS if not (self.reasoning and c in REASON_COLUMNS)]
+        self.writer = StreamingLogWriter(stream_path, self.detail_columns, flush_episodes, flush_interval) if stream_path else None
+        self.width = map_width
+        self.height = map_height
+
+    def add_turn_log(self, episode_id, current_turn, seed, 
+                     lv1_info, lv0_info, 
+                     pos_lv1, pos_lv0, pos_prey_a, pos_prey_b,
+                     dists, 
+                     lv0_verification, lv1_verification, lv1_coop_check, # ★追加: 協調判定
+                     lv1_intent_check="", lv1_mode="",
+                     llm_calls=None, turn_seconds=None):
+        # llm_calls: そのターンの LLM 呼び出しごとの計測値（llm_hunter.call_llm が作る dict のリスト）
+        llm_calls = llm_calls or []
+        api_calls = [c for c in llm_calls if c["status"] != "cache"]
+        used_calls = [c for c in api_calls if c["status"] not in SPECULATIVE_STATUSES]
+        
+        record = {
+            "Episode_ID": episode_id,
+            "Seed": seed,
+            "現在のターン": current_turn,
+            
+            # Lv1
+            "Lv1_狙い(宣言)": lv1_info.get("target_declared", ""),
+            "Lv1_意図推定": lv1_info.get("intent", ""),
+            "Lv1_推定理由": lv1_info.get("intent_reason", ""),
+            "Lv1_決定行動": lv1_info.get("action", ""),
+            "Lv1_行動理由": lv1_info.get("action_reason", ""),
+            "Lv1_近い方を狙ったか": lv1_verification,
+            "Lv1_協調判定(被り回避)": lv1_coop_check, # ★追加
+            "Lv1_意図推定の正誤": lv1_intent_check, # 推定した相手の狙いと相手の宣言の一致
+            "Lv1_モード": lv1_mode, # two-call（推定→行動の2回呼び出し） / fused（1回呼び出し）
+            
+            # Lv0
+            "Lv0_狙い(宣言)": lv0_info.get("target_declared", ""),
+            "Lv0_決定行動": lv0_info.get("action", ""),
+            "Lv0_行動理由": lv0_info.get("action_reason", ""),
+            "Lv0_近い方を狙ったか": lv0_verification,
+            
+            # 座標
+            "Lv1_X": pos_lv1[0], "Lv1_Y": pos_lv1[1],
+            "Lv0_X": pos_lv0[0], "Lv0_Y": pos_lv0[1],
+            "PreyA_X": pos_prey_a[0], "PreyA_Y": pos_prey_a[1],
+            "PreyB_X": pos_prey_b[0], "PreyB_Y": pos_prey_b[1],
+            
+            # 距離
+            "Lv0-A(Manhattan)": dists["d0_a_m"], "Lv0-A(Torus)": dists["d0_a_t"],
+            "Lv0-B(Manhattan)": dists["d0_b_m"], "Lv0-B(Torus)": dists["d0_b_t"],
+            "Lv1-A(Manhattan)": dists["d1_a_m"], "Lv1-A(Torus)": dists["d1_a_t"],
+            "Lv1-B(Manhattan)": dists["d1_b_m"], "Lv1-B(Torus)": dists["d1_b_t"],
+
+            # LLM 呼び出しの計測値
+            "LLM_呼び出し数": len(api_calls),
+            "LLM_キャッシュ": len(llm_calls) - len(api_calls),
+            "LLM_ターン時間(秒)": round(turn_seconds, 3) if turn_seconds is not None else "",
+            "LLM_最大呼び出し時間(秒)": round(max((c["seconds"] for c in used_calls), default=0.0), 3),
+            "LLM_プロンプトトークン": sum(c["prompt_tokens"] for c in llm_calls),
+            "LLM_応答トークン": sum(c["completion_tokens"] for c in llm_calls),
+            "LLM_再試行回数": sum(c["retries"] for c in llm_calls),
+            "LLM_エラー数": sum(1 for c in llm_calls if c["status"] == "error"),
+            # 推測実行で投げたが使わなかった呼び出し数（追加コスト）
+            "LLM_推測破棄数": sum(1 for c in api_calls if c["status"] in SPECULATIVE_STATUSES),
+            # 代替応答（その場に留まる）で行動が決まった呼び出しの種類
+            "LLM_フォールバック": ",".join(sorted({c["kind"] for c in llm_calls if c["status"] == "error"})),
+            "LLM_モデル": "/".join(sorted({c["model"] for c in llm_calls})),
+            # 分位点の集計用（CSV には出力しない）
+            "_llm_call_seconds": [c["seconds"] for c in used_calls],
+        }
+        if self.reasoning:
+            self.episode_reasons.setdefault(episode_id, []).extend(split_reasons(record))
+        if self.writer:
+            self.episode_turns.setdefault(episode_id, []).append(record)
+        else:
+            self.turn_logs.append(record)
+        self.turn_count += 1
+        self.episode_counters.setdefault(episode_id, EpisodeCounter()).add(record)
+
+    def log_episode_end(self, episode_id, final_turn, seed, result_note=""):
+        records = self._end_episode(episode_id, final_turn, seed, result_note)
+        if self.writer:
+            self.writer.put(records)
+
+    async def log_episode_end_async(self, episode_id, final_turn, seed, result_note=""):
+        """log_episode_end と同じ。詳細ログの書き出し待ちが一杯のときは、イベントループを止めずに待つ。"""
+        records = self._end_episode(episode_id, final_turn, seed, result_note)
+        if self.writer:
+            await self.writer.put_async(records)
+
+    def _end_episode(self, episode_id, final_turn, seed, result_note):
+        """エピソードの結果を記録し、逐次書き出しに渡すターン記録を返す。"""
+        # 各種カウントは add_turn_log で足し込み済み
+        c = self.episode_counters.pop(episode_id, None) or EpisodeCounter()
+        records = self.episode_turns.pop(episode_id, [])
+        if self.reasoning:
+            self.reasoning.put_episode(episode_id, self.episode_reasons.pop(episode_id, []))
+
+        self.episode_results.append({
+            "Episode_ID": episode_id,
+            "Seed": seed,
+            "End_Turn": final_turn,
+            "Note": result_note,
+            "Lv0_Match_Count": c.lv0_match,
+            "Lv1_Match_Count": c.lv1_match,
+            "Lv1_Coop_Count": c.lv1_coop, # ★追加: 協調（推定と異なる獲物を狙った）回数
+            "Lv1_Intent_Correct_Count": c.lv1_intent,
+            "Lv1_Mode": "/".join(sorted(c.modes)),
+            # LLM 呼び出しの時間（p50 / p95）とターンあたりのトークン数
+            "Call_Latency_p50": percentile(c.call_seconds, 50),
+            "Call_Latency_p95": percentile(c.call_seconds, 95),
+            "Turn_Time_p50": percentile(c.turn_seconds, 50),
+            "Turn_Time_p95": percentile(c.turn_seconds, 95),
+            "Tokens_per_Turn": round(c.tokens / c.turns, 1) if c.turns else 0,
+            "Retries": c.retries,
+            "LLM_Errors": c.errors,
+            "Fallback_Turns": c.fallback_turns,
+            "Speculative_Discarded": c.speculative_discarded,
+        })
+        self.call_seconds.extend(c.call_seconds)
+        self.turn_seconds.extend(c.turn_seconds)
+        self.api_calls += c.api_calls
+        return records
+
+    def save_all_logs(self, detail_filename="detailed_log.csv", summary_filename="summary_stats.csv"):
+        print("\n--- ログ保存処理開始 ---")
+        if self.reasoning:
+            # 途中で打ち切ったエピソードの理由文も残す
+            for episode_id, rows in self.episode_reasons.items():
+                self.reasoning.put_episode(episode_id, rows)
+            self.episode_reasons = {}
+            print(self.reasoning.summary())
+        if self.writer:
+            # 途中で打ち切ったエピソードの分も書いてから閉じる
+            for records in self.episode_turns.values():
+                self.writer.put(records)
+            self.episode_turns = {}
+            self.writer.close()
+            print(f"詳細ログを保存しました: {self.writer.path} ({self.writer.episodes} エピソード / {self.writer.rows} 行)")
+        elif self.turn_logs and detail_filename.endswith(".parquet"):
+            require_pyarrow()
+            dtypes = {c: DETAIL_DTYPES[c] for c in self.detail_columns}
+            pq.write_table(records_to_table(self.turn_logs, dtypes), detail_filename, compression="zstd")
+            print(f"詳細ログを保存しました: {detail_filename}")
+        elif self.turn_logs:
+            df_detail = pd.DataFrame(self.turn_logs)
+            out_cols = [c for c in self.detail_columns if c in df_detail.columns]
+            df_detail[out_cols].to_csv(detail_filename, index=False, encoding='utf-8_sig')
+            print(f"詳細ログを保存しました: {detail_filename}")
+
+        if self.episode_results:
+            if summary_filename.endswith(".parquet"):
+                # エピソード表を列指向で保存し、統計サマリーはファイルのメタデータに入れる
+                require_pyarrow()
+                table = records_to_table(self.episode_results, EPISODE_DTYPES)
+                stats = json.dumps(dict(self.summary_stats()), ensure_ascii=False)
+                table = table.replace_schema_metadata({"統計サマリー": stats})
+                pq.write_table(table, summary_filename, compression="zstd")
+            else:
+                with open(summary_filename, 'w', encoding='utf-8_sig') as f:
+                    f.write("【統計サマリー】\n")
+                    for label, value in self.summary_stats():
+                        f.write(f"{label},{value}\n")
+                    f.write("\n")
+
+                    f.write(",".join(EPISODE_DTYPES) + "\n")
+                    for r in self.episode_results:
+                        f.write(",".join(str(r[c]) for c in EPISODE_DTYPES) + "\n")
+            print(f"統計サマリーを保存しました: {summary_filename}")
+
+    def summary_stats(self):
+        """統計サマリーの (項目名, 値) のリスト"""
+        turns = [r["End_Turn"] for r in self.episode_results]
+        
+        count = len(turns)
+        avg_turn = round(statistics.mean(turns), 2) if turns else 0
+        max_turn = max(turns) if turns else 0
+        min_turn = min(turns) if turns else 0
+        
+        lv0_matches = [r["Lv0_Match_Count"] for r in self.episode_results]
+        lv1_matches = [r["Lv1_Match_Count"] for r in self.episode_results]
+        lv1_coops = [r["Lv1_Coop_Count"] for r in self.episode_results] # ★追加
+
+        avg_lv0_match = round(statistics.mean(lv0_matches), 2) if lv0_matches else 0
+        avg_lv1_match = round(statistics.mean(lv1_matches), 2) if lv1_matches else 0
+        avg_lv1_coop = round(statistics.mean(lv1_coops), 2) if lv1_coops else 0 # ★追加
+        lv1_intents = [r.get("Lv1_Intent_Correct_Count", 0) for r in self.episode_results]
+        avg_lv1_intent = round(statistics.mean(lv1_intents), 2) if lv1_intents else 0
+        # 同じ指標を Lv1 の呼び出し方式（two-call / fused）ごとに比べられるように方式も残す
+        lv1_modes = "/".join(sorted({r.get("Lv1_Mode", "") for r in self.episode_results} - {""}))
+
+        total_turns = sum(turns)
+        total_tokens = sum(r.get("Tokens_per_Turn", 0) * r["End_Turn"] for r in self.episode_results)
+        # 推測実行の追加コスト（使った呼び出しに対する、捨てた呼び出しの割合）
+        discarded = sum(r.get("Speculative_Discarded", 0) for r in self.episode_results)
+        used = self.api_calls - discarded
+
+        return [
+            ("Lv1 モード", lv1_modes),
+            ("試行回数", count),
+            ("平均ターン数", avg_turn),
+            ("最大ターン数", max_turn),
+            ("最小ターン数", min_turn),
+            ("Lv0 平均一致回数(近接)", avg_lv0_match),
+            ("Lv1 平均一致回数(近接)", avg_lv1_match),
+            ("Lv1 平均協調回数(被り回避)", avg_lv1_coop), # ★追加
+            ("Lv1 平均意図推定正解回数", avg_lv1_intent),
+            ("LLM 呼び出し時間 p50(秒)", self.call_seconds.percentile(50)),
+            ("LLM 呼び出し時間 p95(秒)", self.call_seconds.percentile(95)),
+            ("ターン時間 p50(秒)", self.turn_seconds.percentile(50)),
+            ("ターン時間 p95(秒)", self.turn_seconds.percentile(95)),
+            ("平均トークン数/ターン", round(total_tokens / total_turns, 1) if total_turns else 0),
+            ("LLM 再試行回数(合計)", sum(r.get('Retries', 0) for r in self.episode_results)),
+            ("LLM エラー回数(合計)", sum(r.get('LLM_Errors', 0) for r in self.episode_results)),
+            ("代替応答のターン数(合計)", sum(r.get('Fallback_Turns', 0) for r in self.episode_results)),
+            ("推測実行で破棄した呼び出し(合計)", discarded),
+            ("推測実行の追加リクエスト率(%)", round(discarded / used * 100, 1) if used else 0),
+        ]
+
+    def save_steps_graph(self, filename="episode_steps_graph.png"):
+        if not self.episode_results:
+            return
+
+        episodes = [r["Episode_ID"] for r in self.episode_results]
+        steps = [r["End_Turn"] for r in self.episode_results]
+
+        plt.figure(figsize=(12, 6))
+        plt.bar(episodes, steps, color='skyblue', edgecolor='black', zorder=3)
+
+        plt.xlabel("Episode ID")
+        plt.ylabel("Steps (Moves)")
+        plt.title("Steps per Episode")
+
+        ax = plt.gca()
+        ax.yaxis.set_major_locator(MultipleLocator(5))
+        ax.xaxis.set_major_locator(MultipleLocator(10))
+
+        plt.grid(which='major', axis='both', linestyle='--', linewidth=0.7, zorder=0)
+        
+        plt.savefig(filename)
+        plt.close()
+        print(f"グラフを保存しました: {filename}")
+        print("--- 処理完了 ---")
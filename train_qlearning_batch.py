@@ -0,0 +1,120 @@
+import argparse
+import os
+import time
+import numpy as np
+
+from batch_env import (
+    ACTION_DXY, GRID_W, GRID_H, PREY_UP_PROB, PREY_RIGHT_PROB,
+    relative_offsets, sample_non_overlapping_cells,
+)
+from qtable import QTable
+
+# =========================================================
+#  並列環境 Q学習（agent_qlearning2.py のバッチ版）
+#  K 個の単独ハンター環境を同時に進め、TD 更新を配列でまとめて適用する。
+#  状態・報酬・獲物の動き（500エピソード目から移動開始）は agent_qlearning2.py と同じ。
+# =========================================================
+
+def train_batch(n_envs=256, max_episodes=10000, alpha=0.25, gamma=0.95,
+                eps_start=1.0, eps_end=0.05, eps_decay=0.9995,
+                prey_move_from=500, seed=None, w=GRID_W, h=GRID_H):
+    """
+    戻り値: (QTable, エピソードごとのステップ数リスト, 総遷移数)
+
+    同じ (状態, 行動) への更新が1バッチ内で重なった場合は、TD誤差の平均を1回だけ適用する。
+    epsilon は遷移1回ごとに eps_decay を掛けた場合と同じ値まで減衰させる。
+    """
+    rng = np.random.default_rng(seed)
+    table = QTable(w, h)
+    q = table.values
+    q_flat = q.reshape(-1)
+    n_actions = len(table.actions)
+
+    def spawn(n):
+        cells = sample_non_overlapping_cells(rng, n, 2, w * h)
+        return cells[:, 0] // h, cells[:, 0] % h, cells[:, 1] // h, cells[:, 1] % h
+
+    hx, hy, px, py = spawn(n_envs)
+    steps_in_episode = np.zeros(n_envs, dtype=np.int64)
+    steps_per_episode = []
+    epsilon = eps_start
+    total_steps = 0
+
+    while len(steps_per_episode) < max_episodes:
+        # --- 現在の状態（相対座標） ---
+        dx, dy = relative_offsets(hx, hy, px, py, w, h)
+        sx, sy = table.index(dx, dy)
+
+        # --- epsilon-greedy で行動選択 ---
+        greedy, _ = table.greedy(dx, dy, rng)
+        explore = rng.random(n_envs) < epsilon
+        action = np.where(explore, rng.integers(0, n_actions, n_envs), greedy)
+
+        hx = (hx + ACTION_DXY[action, 0]) % w
+        hy = (hy + ACTION_DXY[action, 1]) % h
+
+        # --- 獲物移動（序盤は静止） ---
+        if len(steps_per_episode) + 1 >= prey_move_from:
+            r = rng.random(n_envs)
+            up = r < PREY_UP_PROB
+            right = (r >= PREY_UP_PROB) & (r < PREY_UP_PROB + PREY_RIGHT_PROB)
+            px = (px + right) % w
+            py = (py - up) % h
+
+        caught = (hx == px) & (hy == py)
+
+        # --- 報酬（捕獲 +10、時間ペナルティ -0.1、接近 +0.2、離脱 -0.3） ---
+        ndx, ndy = relative_offsets(hx, hy, px, py, w, h)
+        dist_before = np.sqrt(dx ** 2 + dy ** 2)
+        dist_after = np.sqrt(ndx ** 2 + ndy ** 2)
+        shaping = np.where(dist_after < dist_before, 0.2, np.where(dist_after > dist_before, -0.3, 0.0))
+        reward = np.where(caught, 10.0, -0.1 + shaping)
+
+        # --- TD 更新（捕獲後は終端なので次状態の価値は 0） ---
+        max_next = np.where(caught, 0.0, table.max_q(ndx, ndy))
+        td_error = reward + gamma * max_next - q[sx, sy, action]
+        flat_idx = np.ravel_multi_index((sx, sy, action), q.shape)
+        td_sum = np.bincount(flat_idx, weights=td_error, minlength=q_flat.size)
+        td_count = np.bincount(flat_idx, minlength=q_flat.size)
+        q_flat += alpha * td_sum / np.maximum(td_count, 1)
+
+        epsilon = max(eps_end, epsilon * eps_decay ** n_envs)
+        total_steps += n_envs
+        steps_in_episode += 1
+
+        # --- 捕獲した環境だけリセット ---
+        if caught.any():
+            steps_per_episode.extend(steps_in_episode[caught].tolist())
+            steps_in_episode[caught] = 0
+            new_hx, new_hy, new_px, new_py = spawn(int(caught.sum()))
+            hx[caught], hy[caught], px[caught], py[caught] = new_hx, new_hy, new_px, new_py
+
+    return table, steps_per_episode[:max_episodes], total_steps
+
+# =========================================================
+#  コマンドライン実行
+# =========================================================
+def main():
+    parser = argparse.ArgumentParser(description="並列環境 Q学習（相対座標・単独ハンター）")
+    parser.add_argument("--envs", type=int, default=256, help="同時に進める環境数 K")
+    parser.add_argument("--episodes", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--out", default="q_table.pkl2", help="保存先（agent_qlearning2.py と同じ形式）")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    table, steps_per_episode, total_steps = train_batch(
+        n_envs=args.envs, max_episodes=args.episodes, seed=args.seed
+    )
+    elapsed = time.perf_counter() - start
+
+    table.save(args.out)
+    print("保存しました:", os.path.abspath(args.out))
+
+    last = steps_per_episode[-1000:]
+    print(f"エピソード数: {len(steps_per_episode)} / 総遷移数: {total_steps}")
+    print(f"直近{len(last)}エピソードの平均ステップ数: {np.mean(last):.2f}")
+    print(f"学習時間: {elapsed:.2f} 秒 ({total_steps / elapsed:,.0f} env-steps/sec)")
+
+if __name__ == "__main__":
+    main()
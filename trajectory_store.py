@@ -0,0 +1,108 @@
+import os
+import numpy as np
+
+# =========================================================
+#  Qテーブル評価の軌跡（1ステップ = 固定長の1レコード）
+#  raw_intention_log（dict のリスト）や CSV では数百万ステップを扱えないので、
+#  NumPy の構造化 dtype で1ステップ 21 バイトのバイナリとしてファイルに追記する。
+#  読むときは np.memmap で開くので、全体を読み込まずにスライスや集計ができる。
+#  ファイル = 16 バイトのヘッダー + レコードの並び（途中で止まった書きかけのレコードは読まない）。
+# =========================================================
+
+MAGIC = b"HUNTTRJ1"
+HEADER_SIZE = 16
+
+ACTIONS = ["UP", "DOWN", "LEFT", "RIGHT", "STAY"]
+TARGETS = ["prey1", "prey2"]
+ACTION_CODES = {name: i for i, name in enumerate(ACTIONS)}
+TARGET_CODES = {name: i for i, name in enumerate(TARGETS)}
+
+# 座標・捕獲フラグは行動を決めた時点（移動前）のもの。action / target は ACTIONS / TARGETS の番号
+TRAJECTORY_DTYPE = np.dtype([
+    ("episode", "<u4"), ("step", "<u2"),
+    ("p1_x", "u1"), ("p1_y", "u1"), ("p2_x", "u1"), ("p2_y", "u1"),
+    ("prey1_x", "u1"), ("prey1_y", "u1"), ("prey2_x", "u1"), ("prey2_y", "u1"),
+    ("hunt1", "?"), ("hunt2", "?"),
+    ("action1", "u1"), ("action2", "u1"),
+    ("target1", "u1"), ("target2", "u1"), ("est_target", "u1"),
+])
+
+def make_record(episode, step, p1, p2, prey1, prey2, hunt1, hunt2, action1, action2, target1, target2, est_target):
+    """1ステップ分を TRAJECTORY_DTYPE の並びのタプルにする（行動・狙いは名前で渡す）。"""
+    return (episode, step, *p1, *p2, *prey1, *prey2, hunt1, hunt2,
+            ACTION_CODES[action1], ACTION_CODES[action2],
+            TARGET_CODES[target1], TARGET_CODES[target2], TARGET_CODES[est_target])
+
+class TrajectoryWriter:
+    def __init__(self, path, buffer_steps=65536, append=False):
+        """append: True なら既存のファイルの後ろに足す（False なら作り直す）"""
+        self.path = path
+        self.steps = 0
+        self._buffer = np.empty(buffer_steps, dtype=TRAJECTORY_DTYPE)
+        self._n = 0
+        if append and os.path.exists(path):
+            self._file = open(path, "ab")
+        else:
+            self._file = open(path, "wb")
+            self._file.write(MAGIC.ljust(HEADER_SIZE, b"\0"))
+
+    def append(self, record):
+        """make_record のタプル1件"""
+        self._buffer[self._n] = record
+        self._n += 1
+        if self._n == len(self._buffer):
+            self.flush()
+
+    def extend(self, records):
+        """TRAJECTORY_DTYPE の配列をまとめて追記する"""
+        self.flush()
+        records.astype(TRAJECTORY_DTYPE, copy=False).tofile(self._file)
+        self.steps += len(records)
+
+    def flush(self):
+        if self._n:
+            self._buffer[:self._n].tofile(self._file)
+            self.steps += self._n
+            self._n = 0
+        self._file.flush()
+
+    def close(self):
+        self.flush()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+def open_trajectory(path):
+    """ファイルをメモリマップした TRAJECTORY_DTYPE の配列（読み取り専用・コピーなし）を返す。"""
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} は軌跡ファイルではありません")
+    count = (os.path.getsize(path) - HEADER_SIZE) // TRAJECTORY_DTYPE.itemsize
+    if count == 0:
+        return np.empty(0, dtype=TRAJECTORY_DTYPE)
+    return np.memmap(path, dtype=TRAJECTORY_DTYPE, mode="r", offset=HEADER_SIZE, shape=(count,))
+
+def episode_bounds(traj):
+    """エピソードごとの (episode, 開始行, 終了行) の配列（同じエピソードのステップは連続している前提）"""
+    episodes = traj["episode"]
+    starts = np.flatnonzero(np.r_[True, episodes[1:] != episodes[:-1]])
+    ends = np.r_[starts[1:], len(episodes)]
+    return np.stack([episodes[starts], starts, ends], axis=1)
+
+def intention_accuracy(traj):
+    """
+    エピソードごとの意図推定の正解率（%）。noplayer_qlearning.py の Accuracy と同じく、
+    どちらの獲物も捕まっていないステップで Lv0 の狙い（target1）と Lv1 の推定（est_target）を比べる。
+    戻り値: (episode の配列, 正解率の配列)
+    """
+    bounds = episode_bounds(traj)
+    index = np.repeat(np.arange(len(bounds)), bounds[:, 2] - bounds[:, 1])
+    free = ~traj["hunt1"] & ~traj["hunt2"]
+    logged = np.bincount(index, weights=free, minlength=len(bounds))
+    correct = np.bincount(index, weights=free & (traj["target1"] == traj["est_target"]), minlength=len(bounds))
+    accuracy = np.divide(correct * 100, logged, out=np.zeros(len(bounds)), where=logged > 0)
+    return bounds[:, 0], accuracy
@@ -0,0 +1,150 @@
+import argparse
+import os
+import time
+import numpy as np
+
+from batch_env import ACTION_DXY, GRID_W, GRID_H, PREY_UP_PROB, PREY_RIGHT_PROB
+from qtable import QTable
+
+# =========================================================
+#  単独ハンター MDP の価値反復（agent_qlearning2.py の厳密解）
+#  状態は獲物の相対位置 (dx, dy)（トーラス上で w*h 通り）。
+#  1ステップ = ハンター移動 → 獲物移動 → 捕獲判定、報酬も agent_qlearning2.py と同じ。
+# =========================================================
+
+# 獲物の移動: (dx, dy, 確率)  20%で上、40%で右、40%でその場に留まる
+PREY_MOVES = [
+    (0, -1, PREY_UP_PROB),
+    (1, 0, PREY_RIGHT_PROB),
+    (0, 0, 1.0 - PREY_UP_PROB - PREY_RIGHT_PROB),
+]
+
+def _torus_norm(dx, dy, w, h):
+    dx = np.minimum(dx % w, w - dx % w)
+    dy = np.minimum(dy % h, h - dy % h)
+    return np.sqrt(dx ** 2 + dy ** 2)
+
+def build_model(w=GRID_W, h=GRID_H, catch_reward=10.0, step_penalty=-0.1,
+                approach_bonus=0.2, retreat_penalty=-0.3):
+    """
+    遷移テンソルを作る。状態番号は (dx % w) * h + (dy % h)。
+    戻り値: (next_state[S, A, K], reward[S, A, K], caught[S, A, K], prob[K])
+    """
+    n_states = w * h
+    sdx, sdy = np.divmod(np.arange(n_states), h)
+    # ハンターが動くと相対位置は逆向きにずれ、獲物が動くと同じ向きにずれる
+    dx = sdx[:, None, None] - ACTION_DXY[None, :, 0, None] + np.array([m[0] for m in PREY_MOVES])[None, None, :]
+    dy = sdy[:, None, None] - ACTION_DXY[None, :, 1, None] + np.array([m[1] for m in PREY_MOVES])[None, None, :]
+    next_state = (dx % w) * h + (dy % h)
+    caught = next_state == 0
+
+    dist_before = _torus_norm(sdx, sdy, w, h)[:, None, None]
+    dist_after = _torus_norm(dx, dy, w, h)
+    shaping = np.where(dist_after < dist_before, approach_bonus,
+                       np.where(dist_after > dist_before, retreat_penalty, 0.0))
+    reward = np.where(caught, catch_reward, step_penalty + shaping)
+    prob = np.array([m[2] for m in PREY_MOVES])
+    return next_state, reward, caught, prob
+
+def _backup(v, model, gamma):
+    next_state, reward, caught, prob = model
+    q = (prob * (reward + gamma * np.where(caught, 0.0, v[next_state]))).sum(axis=-1)
+    q[0] = 0.0  # (0, 0) は捕獲済みの終端状態
+    return q
+
+def value_iteration(model, gamma=0.95, tol=1e-10, max_iter=10000):
+    """戻り値: (Q[S, A], 反復回数)"""
+    v = np.zeros(model[0].shape[0])
+    for it in range(1, max_iter + 1):
+        q = _backup(v, model, gamma)
+        v_new = q.max(axis=1)
+        if np.abs(v_new - v).max() < tol:
+            return q, it
+        v = v_new
+    return q, max_iter
+
+def evaluate_policy(pi, model, gamma=0.95, tol=1e-10, max_iter=10000):
+    """pi[S, A]（行動確率）の状態価値を反復で求める。"""
+    v = np.zeros(model[0].shape[0])
+    for _ in range(max_iter):
+        v_new = (pi * _backup(v, model, gamma)).sum(axis=1)
+        if np.abs(v_new - v).max() < tol:
+            break
+        v = v_new
+    return v_new
+
+# ===== QTable（相対座標 ±w/2）との変換 =====
+def to_qtable(q, w=GRID_W, h=GRID_H):
+    table = QTable(w, h)
+    for dx in range(-table.half_w, table.half_w + 1):
+        for dy in range(-table.half_h, table.half_h + 1):
+            table.values[table.index(dx, dy)] = q[(dx % w) * h + (dy % h)]
+    return table
+
+def from_qtable(table, w=GRID_W, h=GRID_H):
+    # トーラス上で同じ状態になる -w/2 と +w/2 は、後に書かれる +w/2 側の値を使う
+    q = np.zeros((w * h, len(table.actions)))
+    for dx in range(-table.half_w, table.half_w + 1):
+        for dy in range(-table.half_h, table.half_h + 1):
+            q[(dx % w) * h + (dy % h)] = table.values[table.index(dx, dy)]
+    return q
+
+def greedy_distribution(q, atol=0.0):
+    """最大Q値の行動に一様な確率を置いた方策（同点はランダムに選ぶ実装と同じ）。"""
+    best = np.isclose(q, q.max(axis=1, keepdims=True), rtol=0.0, atol=atol)
+    return best / best.sum(axis=1, keepdims=True)
+
+def compare_with_optimal(q_learned, q_opt, model, gamma=0.95):
+    """学習済み Qテーブルと最適解の差を返す（終端状態 (0, 0) は除く）。"""
+    live = np.arange(q_opt.shape[0]) != 0
+    # 最適解の同点は浮動小数点の誤差を許して判定する
+    opt_best = greedy_distribution(q_opt, atol=1e-9) > 0
+    pi = greedy_distribution(q_learned)
+    v_opt = q_opt.max(axis=1)
+    v_pi = evaluate_policy(pi, model, gamma)
+    return {
+        "max_abs_q_error": float(np.abs(q_learned - q_opt)[live].max()),
+        "mean_abs_q_error": float(np.abs(q_learned - q_opt)[live].mean()),
+        # 学習済み方策が最適行動だけを選ぶ状態の割合
+        "greedy_agreement": float((pi[live] <= opt_best[live]).all(axis=1).mean()),
+        "mean_value_optimal": float(v_opt[live].mean()),
+        "mean_value_learned_policy": float(v_pi[live].mean()),
+        "max_value_gap": float((v_opt - v_pi)[live].max()),
+    }
+
+# =========================================================
+#  コマンドライン実行
+# =========================================================
+def main():
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description="単独ハンター MDP の価値反復")
+    parser.add_argument("--gamma", type=float, default=0.95)
+    parser.add_argument("--out", default="q_table_optimal.pkl", help="最適 Qテーブルの保存先（pickle 辞書形式）")
+    parser.add_argument("--compare", nargs="*", default=[
+        os.path.join(base_dir, "q_table.pkl"), os.path.join(base_dir, "q_table.pkl2"),
+    ], help="最適解と比較する学習済み Qテーブル")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    model = build_model()
+    q_opt, iterations = value_iteration(model, args.gamma)
+    elapsed = time.perf_counter() - start
+
+    to_qtable(q_opt).save(args.out)
+    print(f"最適 Qテーブルを保存しました: {args.out}")
+    print(f"価値反復: {iterations} 回, {elapsed * 1000:.1f} ms")
+
+    for path in args.compare:
+        if not os.path.exists(path):
+            print(f"Warning: {path} not found.")
+            continue
+        q_learned = from_qtable(QTable.load(path, dtype=np.float64))
+        stats = compare_with_optimal(q_learned, q_opt, model, args.gamma)
+        print(f"\n--- {os.path.basename(path)} と最適解の比較 ---")
+        print(f"Q値の誤差: 最大 {stats['max_abs_q_error']:.3f} / 平均 {stats['mean_abs_q_error']:.3f}")
+        print(f"最適行動の一致率: {stats['greedy_agreement'] * 100:.1f}%")
+        print(f"平均状態価値: 最適 {stats['mean_value_optimal']:.3f} / 学習済み方策 {stats['mean_value_learned_policy']:.3f}")
+        print(f"状態価値の最大損失: {stats['max_value_gap']:.3f}")
+
+if __name__ == "__main__":
+    main()